@@ -0,0 +1,116 @@
+# SPDX-License-Identifier: MIT
+# Copyright (c) 2025 Elinsrc
+
+"""Measure how long finding the handlers of a new message takes, with and without the command index.
+
+Run it from the repository root with ``python -m benchmarks.command_dispatch``.
+The plugins are imported to get their real handlers and filters, those whose
+dependencies are missing are left out. Only the filters are run, not the handlers.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import importlib
+import time
+from pathlib import Path
+
+from hydrogram import Client
+from hydrogram.enums import ChatType
+from hydrogram.handlers import MessageHandler
+from hydrogram.types import Chat, Message, User
+
+from config import PREFIXES
+from miku.dispatcher import MikuDispatcher
+
+ROUNDS = 200
+# The best of this many runs is kept, to leave out the noise of the machine.
+REPEATS = 5
+
+SAMPLES = {
+    "plain text": "hello there",
+    "command": f"{PREFIXES[0]}ban",
+    "command with username": f"{PREFIXES[0]}warns@MikuBot",
+    "unknown command": f"{PREFIXES[0]}nothing",
+    "sed": "s/foo/bar/",
+}
+
+
+def load_handlers(dispatcher: MikuDispatcher) -> list[str]:
+    skipped = []
+    for path in sorted(Path("miku", "plugins").rglob("*.py")):
+        name = ".".join(path.with_suffix("").parts)
+        try:
+            module = importlib.import_module(name)
+        except ImportError:
+            skipped.append(name)
+            continue
+
+        for obj in vars(module).values():
+            for handler, group in getattr(obj, "handlers", []) if callable(obj) else []:
+                dispatcher.add_handler(handler, group)
+    return skipped
+
+
+async def check(client: Client, handlers, message: Message) -> int:
+    checked = 0
+    for handler in handlers:
+        if isinstance(handler, MessageHandler):
+            checked += 1
+            try:
+                await handler.check(client, message)
+            except Exception:
+                pass
+    return checked
+
+
+async def best_of(run) -> float:
+    """The shortest time, in seconds, ``run`` took over ROUNDS calls, averaged per call."""
+    timings = []
+    for _ in range(REPEATS):
+        started = time.perf_counter()
+        for _ in range(ROUNDS):
+            await run()
+        timings.append((time.perf_counter() - started) / ROUNDS)
+    return min(timings)
+
+
+async def main():
+    client = Client("benchmark", api_id=1, api_hash="benchmark", in_memory=True, no_updates=True)
+    client.me = User(id=1, is_bot=True, username="MikuBot")
+    dispatcher = MikuDispatcher(client)
+    skipped = load_handlers(dispatcher)
+
+    total = sum(len(handlers) for handlers in dispatcher.groups.values())
+    print(f"{total} handlers in {len(dispatcher.groups)} groups, best of {REPEATS}x{ROUNDS} rounds")
+    if skipped:
+        print(f"Left out, missing dependencies: {', '.join(skipped)}")
+
+    chat = Chat(id=-1001234567890, type=ChatType.SUPERGROUP)
+    user = User(id=12345, first_name="Miku")
+    for name, text in SAMPLES.items():
+        message = Message(id=1, chat=chat, from_user=user, text=text, client=client)
+
+        async def linear(message=message):
+            for handlers in dispatcher.groups.values():
+                await check(client, handlers, message)
+
+        async def indexed(message=message):
+            for handlers in dispatcher.handlers_for(message, MessageHandler):
+                await check(client, handlers, message)
+
+        checked = [
+            sum([await check(client, handlers, message) for handlers in strategy])
+            for strategy in (
+                dispatcher.groups.values(),
+                dispatcher.handlers_for(message, MessageHandler),
+            )
+        ]
+        print(
+            f"{name:>22}: linear {await best_of(linear) * 1e6:7.1f} us ({checked[0]} filters),"
+            f" indexed {await best_of(indexed) * 1e6:7.1f} us ({checked[1]} filters)"
+        )
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,108 @@
+# SPDX-License-Identifier: MIT
+# Copyright (c) 2025 Elinsrc
+
+"""Measure read throughput while warns and welcome messages are being written.
+
+Run it from the repository root with ``python -m benchmarks.database_reads``.
+It uses a temporary database, so the one set in ``config.py`` is left untouched.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import random
+import tempfile
+import time
+from pathlib import Path
+
+from config import DATABASE_PATH
+from miku.database import database
+from miku.database.backends import SQLiteBackend
+
+CHATS = 200
+USERS = 500
+READERS = 32
+WRITERS = 32
+DURATION = 5
+
+
+async def reader(stop: asyncio.Event, latencies: list[float]) -> int:
+    from miku.database.chats import chat_exists  # noqa: PLC0415
+    from miku.database.warns import get_warns  # noqa: PLC0415
+    from miku.utils.consts import GROUP_TYPES  # noqa: PLC0415
+
+    reads = 0
+    while not stop.is_set():
+        chat_id = -random.randint(1, CHATS)
+        started = time.perf_counter()
+        await chat_exists(chat_id, GROUP_TYPES[1])
+        await get_warns(chat_id, random.randint(1, USERS))
+        latencies.append((time.perf_counter() - started) / 2)
+        reads += 2
+    return reads
+
+
+async def writer(stop: asyncio.Event) -> int:
+    from miku.database.warns import add_warns  # noqa: PLC0415
+    from miku.database.welcome import set_welcome  # noqa: PLC0415
+
+    writes = 0
+    while not stop.is_set():
+        chat_id = -random.randint(1, CHATS)
+        await add_warns(chat_id, random.randint(1, USERS), 1)
+        await set_welcome(chat_id, f"Welcome {{mention}}! #{writes}")
+        writes += 2
+    return writes
+
+
+async def run(pool_size: int) -> tuple[float, float, float, float]:
+    from miku.database.chats import add_chat, chat_types, get_chat_context  # noqa: PLC0415
+    from miku.utils.consts import GROUP_TYPES  # noqa: PLC0415
+
+    # Create it next to the real database, so it is on the same kind of disk.
+    with tempfile.TemporaryDirectory(dir=Path(DATABASE_PATH).resolve().parent) as tempdir:
+        database.path = str(Path(tempdir) / "bench.db")
+        database.pool_size = pool_size
+        await database.connect()
+
+        for chat_id in range(1, CHATS + 1):
+            await add_chat(-chat_id, GROUP_TYPES[1])
+
+        # Every update goes through get_chat_context, which keeps the chat types known.
+        chat_types.clear()
+        await get_chat_context(-1, GROUP_TYPES[1])
+        if chat_types.get(-1) != GROUP_TYPES[1]:
+            raise SystemExit("get_chat_context didn't remember the chat type.")
+
+        stop = asyncio.Event()
+        latencies = []
+        readers = [asyncio.create_task(reader(stop, latencies)) for _ in range(READERS)]
+        writers = [asyncio.create_task(writer(stop)) for _ in range(WRITERS)]
+        await asyncio.sleep(DURATION)
+        stop.set()
+
+        reads = sum(await asyncio.gather(*readers))
+        writes = sum(await asyncio.gather(*writers))
+        await database.close()
+
+    latencies.sort()
+    p50 = latencies[len(latencies) // 2] * 1000
+    p99 = latencies[int(len(latencies) * 0.99)] * 1000
+    return reads / DURATION, writes / DURATION, p50, p99
+
+
+async def main():
+    if not isinstance(database, SQLiteBackend):
+        raise SystemExit("The read pool benchmark needs DATABASE_PATH to be an SQLite file.")
+
+    for pool_size in (0, 2, 4, 8):
+        reads, writes, p50, p99 = await run(pool_size)
+        label = "writer only" if pool_size == 0 else f"{pool_size} readers"
+        print(
+            f"{label:>12}: {reads:8.0f} reads/s (p50 {p50:.2f} ms, p99 {p99:.2f} ms)"
+            f" {writes:8.0f} writes/s"
+        )
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
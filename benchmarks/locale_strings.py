@@ -0,0 +1,102 @@
+# SPDX-License-Identifier: MIT
+# Copyright (c) 2025 Elinsrc
+
+"""Measure how long rendering the /help categories takes, per string lookup strategy.
+
+Run it from the repository root with ``python -m benchmarks.locale_strings``.
+The commands are read from the plugins' ``commands.add_command`` calls, so the
+plugins and their dependencies don't need to be importable.
+"""
+
+from __future__ import annotations
+
+import ast
+import time
+from functools import partial
+from pathlib import Path
+
+from miku.utils.localization import default_language, get_strings, langdict
+from miku.utils.utils import BotCommands
+
+ROUNDS = 2000
+# The best of this many runs is kept, to leave out the noise of the machine.
+REPEATS = 5
+
+
+def legacy_get_locale_string(language: str, key: str) -> str:
+    """The lookup walking the fallback chain on every call, as it was before the compiled tables."""
+    if "@" in language and language.split("@", 1)[0] in langdict:
+        string = langdict[language].get(key) or langdict[language.split("@", 1)[0]].get(key)
+    else:
+        string = langdict[language].get(key)
+
+    return string or langdict[default_language].get(key) or key
+
+
+def load_commands() -> BotCommands:
+    commands = BotCommands()
+    for path in sorted(Path("miku", "plugins").rglob("*.py")):
+        for node in ast.walk(ast.parse(path.read_text(encoding="utf8"))):
+            if (
+                isinstance(node, ast.Call)
+                and isinstance(node.func, ast.Attribute)
+                and node.func.attr == "add_command"
+                and isinstance(node.func.value, ast.Name)
+                and node.func.value.id == "commands"
+            ):
+                args = [arg.value for arg in node.args if isinstance(arg, ast.Constant)]
+                if len(args) >= 2:
+                    commands.add_command(args[0], args[1])
+    return commands
+
+
+def render_all(commands: BotCommands, strings):
+    for category in commands.commands:
+        commands.get_commands_message(strings, category)
+
+
+def lookup_all(keys: list[str], strings):
+    for key in keys:
+        strings(key)
+
+
+def best_of(run) -> float:
+    """The shortest time, in seconds, ``run`` took over ROUNDS calls, averaged per call."""
+    timings = []
+    for _ in range(REPEATS):
+        started = time.perf_counter()
+        for _ in range(ROUNDS):
+            run()
+        timings.append((time.perf_counter() - started) / ROUNDS)
+    return min(timings)
+
+
+def main():
+    commands = load_commands()
+    print(
+        f"{sum(len(cmds) for cmds in commands.commands.values())} commands"
+        f" in {len(commands.commands)} categories, best of {REPEATS}x{ROUNDS} rounds"
+    )
+
+    # Every key of the help, plus one missing from all locales.
+    keys = ["cmds_list_category_title", "missing_key"] + [
+        cmd["description_key"] for cmds in commands.commands.values() for cmd in cmds
+    ]
+
+    for locale in langdict:
+        strategies = {
+            "fallback chain": partial(legacy_get_locale_string, locale),
+            "compiled": get_strings(locale),
+        }
+        for name, strings in strategies.items():
+            render = best_of(lambda: render_all(commands, strings))  # noqa: B023
+            lookup = best_of(lambda: lookup_all(keys, strings)) / len(keys)  # noqa: B023
+
+            print(
+                f"{locale} {name:>14}: {render * 1e6:6.1f} us per /help render,"
+                f" {lookup * 1e9:5.0f} ns per string lookup"
+            )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,44 @@
+# SPDX-License-Identifier: MIT
+# Copyright (c) 2025 Elinsrc
+
+"""Show how the sends to a chat are spread out once its FloodWait is over.
+
+Run it from the repository root with ``python -m benchmarks.outbound_flood``.
+A bucket faster than the real ones is blocked, then emptied by queued sends,
+which must go out one token at a time instead of in a burst.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import time
+
+from miku.outbound import TokenBucket
+
+RATE = 20.0
+BURST = 5
+BLOCK = 0.5
+SENDS = 10
+
+
+async def main():
+    bucket = TokenBucket(RATE, BURST)
+    bucket.block(BLOCK)
+    started = time.monotonic()
+
+    sent = []
+    for _ in range(SENDS):
+        await bucket.acquire(priority=0)
+        sent.append(time.monotonic() - started)
+
+    gaps = [later - earlier for earlier, later in zip(sent, sent[1:], strict=False)]
+    print(f"first send after {sent[0]:.3f}s, blocked for {BLOCK}s")
+    print(f"gaps between the sends: {', '.join(f'{gap:.3f}' for gap in gaps)}s")
+
+    # A little slack for the timers of the event loop.
+    if sent[0] < BLOCK or min(gaps) < 0.9 / RATE:
+        raise SystemExit("The bucket let a burst through after its FloodWait.")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
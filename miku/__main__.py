@@ -12,6 +12,7 @@ from hydrogram import idle
 
 from .bot import MikuBot
 from .database import database
+from .database.chats import load_known_chats
 from .utils import http, InterceptHandler
 
 logging.basicConfig(handlers=[InterceptHandler()], level=0, force=True)
@@ -47,6 +48,7 @@ async def main():
     try:
         # start the bot
         await database.connect()
+        await load_known_chats()
         await miku.start()
 
         if "test" not in sys.argv:
@@ -2,18 +2,25 @@
 # Copyright (c) 2018-2024 Amano LLC
 
 from loguru import logger
+import functools
 import time
-from functools import partial
 
 import hydrogram
 from hydrogram import Client
 from hydrogram.enums import ParseMode
 from hydrogram.errors import BadRequest
+from hydrogram.handlers import CallbackQueryHandler
 from hydrogram.raw.all import layer
+from hydrogram.session import Session
 
 from config import API_HASH, API_ID, DISABLED_PLUGINS, LOG_CHAT, TOKEN, WORKERS
 
 from . import __commit__, __version_number__
+from .database import database
+from .dispatcher import MikuDispatcher
+from .jobs import job_runner
+from .outbound import Outbound
+from .utils.callbacks import dispatch_callback
 
 class MikuBot(Client):
     def __init__(self):
@@ -31,18 +38,25 @@ class MikuBot(Client):
             sleep_threshold=180,
         )
 
+        self.dispatcher = MikuDispatcher(self)
+        self.outbound = Outbound()
+
     async def start(self):
+        # Stopping the bot removes every handler, so it's added at each start.
+        self.add_handler(CallbackQueryHandler(dispatch_callback))
         await super().start()
 
         self.start_time = time.time()
 
+        # The plugins, and so the job handlers, are loaded by now.
+        job_runner.start(self)
+
         logger.info(f"MikuBot running with Hydrogram v{hydrogram.__version__} (Layer {layer}) started on @{self.me.username}. Hi!")
 
-        from .database.restarted import del_restarted, get_restarted  # noqa: PLC0415
-        from miku.utils.localization import get_locale_string, get_lang
+        from .database.restarted import pop_restarted  # noqa: PLC0415
+        from miku.utils.localization import get_lang, get_strings
 
-        wr = await get_restarted()
-        await del_restarted()
+        wr = await pop_restarted()
 
         start_message = (
             "<b>MikuBot started!</b>\n\n"
@@ -54,11 +68,30 @@ class MikuBot(Client):
             await self.send_message(chat_id=LOG_CHAT, text=start_message)
             if wr:
                 lang = await get_lang(message=wr[0], client=self)
-                strings = partial(get_locale_string, lang)
+                strings = get_strings(lang)
                 await self.edit_message_text(wr[0], wr[1], text=strings("sudos_restarted"))
         except BadRequest:
             logger.warning("Unable to send message to LOG_CHAT.")
 
+    async def invoke(
+        self,
+        query,
+        retries: int = Session.MAX_RETRIES,
+        timeout: float = Session.WAIT_TIMEOUT,
+        sleep_threshold: float | None = None,
+    ):
+        # The messages sent go through the rate limits of their chat first.
+        if sleep_threshold is None:
+            sleep_threshold = self.sleep_threshold
+        send = functools.partial(super().invoke, query, retries, timeout)
+        return await self.outbound.invoke(send, query, sleep_threshold)
+
     async def stop(self):
+        await job_runner.stop()
         await super().stop()
+
+        # Make sure the writes made by the last updates reach the disk.
+        if database.is_connected:
+            await database.flush()
+
         logger.warning("MikuBot stopped. Bye!")
@@ -0,0 +1,23 @@
+# SPDX-License-Identifier: MIT
+# Copyright (c) 2025 Elinsrc
+
+"""The admin rosters stored by miku.utils.admins.
+
+They aren't in admins.py, which imports the settings, and so miku.utils, as
+miku.utils imports this module.
+"""
+
+from __future__ import annotations
+
+from .core import database
+
+
+async def get_cached_admins(chat_id: int) -> str | None:
+    row = await database.fetchone("SELECT cached_admins FROM groups WHERE chat_id = ?", (chat_id,))
+    return row[0] if row else None
+
+
+async def set_cached_admins(chat_id: int, admins: str | None) -> None:
+    await database.execute(
+        "UPDATE groups SET cached_admins = ? WHERE chat_id = ?", (admins, chat_id), wait=True
+    )
@@ -4,29 +4,29 @@
 from __future__ import annotations
 
 from .core import database
-
-conn = database.get_conn()
+from .settings import get_chat_settings, invalidate_chat_settings
 
 
 async def check_if_del_service(chat_id: int) -> bool:
-    cursor = await conn.execute("SELECT delservicemsgs FROM groups WHERE chat_id = ?", (chat_id,))
-    row = await cursor.fetchone()
-    await cursor.close()
-    return row[0]
+    settings = await get_chat_settings(chat_id)
+    return settings.delservicemsgs if settings else None
 
 
 async def toggle_del_service(chat_id: int, mode: bool | None) -> None:
-    await conn.execute("UPDATE groups SET delservicemsgs = ? WHERE chat_id = ?", (mode, chat_id))
-    await conn.commit()
+    await database.execute(
+        "UPDATE groups SET delservicemsgs = ? WHERE chat_id = ?", (mode, chat_id), wait=True
+    )
+    invalidate_chat_settings(chat_id)
 
 
 async def check_if_antichannelpin(chat_id: int) -> bool:
-    cursor = await conn.execute("SELECT antichannelpin FROM groups WHERE chat_id = ?", (chat_id,))
-    row = await cursor.fetchone()
-    await cursor.close()
-    return row[0]
+    settings = await get_chat_settings(chat_id)
+    return settings.antichannelpin if settings else None
 
 
 async def toggle_antichannelpin(chat_id: int, mode: bool | None) -> None:
-    await conn.execute("UPDATE groups SET antichannelpin = ? WHERE chat_id = ?", (mode, chat_id))
-    await conn.commit()
+    await database.execute(
+        "UPDATE groups SET antichannelpin = ? WHERE chat_id = ?", (mode, chat_id), wait=True
+    )
+    invalidate_chat_settings(chat_id)
+
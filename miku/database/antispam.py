@@ -2,27 +2,21 @@
 # Copyright (c) 2025 Elinsrc
 
 from .core import database
-
-conn = database.get_conn()
+from .settings import get_chat_settings, invalidate_chat_settings
 
 
 async def get_antispam(chat_id: int) -> bool:
-    cursor = await conn.execute(
-        "SELECT antispam_enabled FROM antispam WHERE chat_id = ?", (chat_id,)
-    )
-    row = await cursor.fetchone()
-    if row is None:
-        return False
-    return bool(row[0])
+    # Antispam can only be enabled in groups, which have their settings cached.
+    settings = await get_chat_settings(chat_id)
+    return bool(settings and settings.antispam_enabled)
 
 
 async def enable_antispam(chat_id: int, mode: bool):
-    result = await conn.execute(
-        "UPDATE antispam SET antispam_enabled = ? WHERE chat_id = ?", (int(mode), chat_id)
+    await database.execute(
+        "INSERT INTO antispam (chat_id, antispam_enabled) VALUES (?, ?) "
+        "ON CONFLICT (chat_id) DO UPDATE SET antispam_enabled = excluded.antispam_enabled",
+        (chat_id, int(mode)),
+        wait=True,
     )
-    if result.rowcount == 0:
-        await conn.execute(
-            "INSERT INTO antispam (chat_id, antispam_enabled) VALUES (?, ?)", (chat_id, int(mode))
-        )
-    await conn.commit()
+    invalidate_chat_settings(chat_id)
 
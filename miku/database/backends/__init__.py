@@ -0,0 +1,7 @@
+# SPDX-License-Identifier: MIT
+# Copyright (c) 2025 Elinsrc
+
+from .base import Backend
+from .sqlite import SQLiteBackend
+
+__all__: list[str] = ["Backend", "SQLiteBackend"]
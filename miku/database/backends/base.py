@@ -0,0 +1,84 @@
+# SPDX-License-Identifier: MIT
+# Copyright (c) 2025 Elinsrc
+
+from __future__ import annotations
+
+from abc import ABC, abstractmethod
+from collections.abc import Callable, Iterable, Sequence
+from typing import Any, ClassVar
+
+
+class Backend(ABC):
+    """The storage the database layer runs on.
+
+    Queries use ``?`` placeholders and the SQL shared by SQLite and PostgreSQL,
+    each backend translates them if it needs to.
+    """
+
+    # The exception the driver raises when a statement fails.
+    Error: ClassVar[type[Exception]] = Exception
+
+    def __init__(self):
+        self.is_connected: bool = False
+        self._invalidation_listeners: list[Callable[[int | None], Any]] = []
+
+    @abstractmethod
+    async def connect(self):
+        """Connect to the database and bring its schema up to date."""
+
+    @abstractmethod
+    async def close(self):
+        """Commit what is still pending and close the connections."""
+
+    @abstractmethod
+    async def fetchall(
+        self, sql: str, parameters: Iterable[Any] = (), *, writer: bool = False
+    ) -> list[Sequence[Any]]:
+        """Run a query and return all its rows.
+
+        Rows can be indexed both by position and by column name. Queries which must
+        see the writes that are still waiting to be committed should pass ``writer=True``.
+        """
+
+    async def fetchone(
+        self, sql: str, parameters: Iterable[Any] = (), *, writer: bool = False
+    ) -> Sequence[Any] | None:
+        """Same as :meth:`fetchall`, but only return the first row, if any."""
+        rows = await self.fetchall(sql, parameters, writer=writer)
+        return rows[0] if rows else None
+
+    @abstractmethod
+    async def execute(self, sql: str, parameters: Iterable[Any] = (), *, wait: bool = False) -> int:
+        """Run a write statement and return the number of rows it changed.
+
+        Backends may delay the commit, ``wait=True`` waits until the statement is
+        committed, so that any connection can read it back.
+        """
+
+    @abstractmethod
+    async def run_batch(
+        self, statements: Sequence[tuple[str, Iterable[Any]]], *, wait: bool = False
+    ) -> list[list[Sequence[Any]]]:
+        """Run several statements at once, as a single transaction, and return the rows of each.
+
+        Either all the statements are applied or, if one of them fails, none is.
+        ``wait`` works as in :meth:`execute`.
+        """
+
+    @abstractmethod
+    async def flush(self):
+        """Commit every pending write now and wait for it."""
+
+    @abstractmethod
+    async def reclaim_space(self) -> int:
+        """Give the free space back and refresh the planner stats, return the pages reclaimed."""
+
+    def add_invalidation_listener(self, callback: Callable[[int | None], Any]):
+        """Call ``callback`` when another process invalidates the settings of a chat."""
+        self._invalidation_listeners.append(callback)
+
+    def publish_invalidation(self, chat_id: int | None):
+        """Tell the other processes sharing the database that a chat's settings changed.
+
+        Only backends which can be shared between processes have something to do here.
+        """
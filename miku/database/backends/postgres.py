@@ -0,0 +1,165 @@
+# SPDX-License-Identifier: MIT
+# Copyright (c) 2025 Elinsrc
+
+from __future__ import annotations
+
+import asyncio
+import re
+import uuid
+from collections.abc import Iterable, Sequence
+from functools import lru_cache
+from typing import Any
+
+from loguru import logger
+
+import asyncpg
+
+from ..maintenance import maintenance_loop
+from ..migrations import migrate_postgres
+from ..stats import instrumented
+from .base import Backend
+
+# Size of the connection pool, shared by reads and writes.
+POOL_MIN_SIZE = 2
+POOL_MAX_SIZE = 10
+
+# Prepared statements kept by each connection, the queries of the bot all fit.
+STATEMENT_CACHE_SIZE = 256
+
+# Channel the processes sharing the database use to invalidate each other's caches.
+INVALIDATION_CHANNEL = "miku_settings"
+
+_placeholder = re.compile(r"'(?:[^']|'')*'|\?")
+
+
+@lru_cache(maxsize=STATEMENT_CACHE_SIZE)
+def translate(sql: str) -> str:
+    """Turn the ``?`` placeholders of a query into PostgreSQL's ``$1``, ``$2``…"""
+    number = 0
+
+    def replace(match: re.Match) -> str:
+        nonlocal number
+        if match[0] != "?":  # a string literal
+            return match[0]
+        number += 1
+        return f"${number}"
+
+    return _placeholder.sub(replace, sql)
+
+
+def adapt(parameters: Iterable[Any]) -> tuple[Any, ...]:
+    # The flags are INTEGER columns, asyncpg doesn't cast booleans to them.
+    return tuple(int(p) if isinstance(p, bool) else p for p in parameters)
+
+
+class PostgresBackend(Backend):
+    """Store the data on a PostgreSQL server, which several bot processes can share.
+
+    Every statement is committed on its own, so writes are visible to every
+    connection right away. asyncpg prepares the statements and caches them on
+    each connection of the pool.
+    """
+
+    Error = asyncpg.PostgresError
+
+    def __init__(self, dsn: str):
+        super().__init__()
+        self.dsn: str = dsn
+        self.pool: asyncpg.Pool = None
+
+        self._instance_id: str = uuid.uuid4().hex
+        self._listener: asyncpg.Connection | None = None
+        self._notify_tasks: set[asyncio.Task] = set()
+        self._maintenance_task: asyncio.Task | None = None
+
+    async def connect(self):
+        self.pool = await asyncpg.create_pool(
+            self.dsn,
+            min_size=POOL_MIN_SIZE,
+            max_size=POOL_MAX_SIZE,
+            statement_cache_size=STATEMENT_CACHE_SIZE,
+        )
+
+        async with self.pool.acquire() as conn:
+            await migrate_postgres(conn)
+
+        # A dedicated connection, LISTEN is bound to the session.
+        self._listener = await asyncpg.connect(self.dsn)
+        await self._listener.add_listener(INVALIDATION_CHANNEL, self._on_invalidation)
+
+        self.is_connected: bool = True
+
+        self._maintenance_task = asyncio.create_task(maintenance_loop(self))
+
+        logger.info("The database has been connected.")
+
+    async def close(self):
+        self._maintenance_task.cancel()
+
+        # Let the other processes know about the last changes, then close the connections
+        await asyncio.gather(*self._notify_tasks, return_exceptions=True)
+        await self._listener.close()
+        await self.pool.close()
+
+        self.is_connected: bool = False
+
+        logger.info("The database was closed.")
+
+    @instrumented
+    async def fetchall(
+        self, sql: str, parameters: Iterable[Any] = (), *, writer: bool = False
+    ) -> list[asyncpg.Record]:
+        # Writes are committed right away, any connection sees them.
+        return await self.pool.fetch(translate(sql), *adapt(parameters))
+
+    @instrumented
+    async def execute(self, sql: str, parameters: Iterable[Any] = (), *, wait: bool = False) -> int:
+        status = await self.pool.execute(translate(sql), *adapt(parameters))
+        # The status is the command tag, e.g. "UPDATE 1" or "INSERT 0 1".
+        count = status.rsplit(" ", 1)[-1]
+        return int(count) if count.isdigit() else 0
+
+    @instrumented
+    async def run_batch(
+        self, statements: Sequence[tuple[str, Iterable[Any]]], *, wait: bool = False
+    ) -> list[list[asyncpg.Record]]:
+        async with self.pool.acquire() as conn, conn.transaction():
+            return [
+                await conn.fetch(translate(sql), *adapt(parameters))
+                for sql, parameters in statements
+            ]
+
+    async def flush(self):
+        # Nothing is ever pending.
+        pass
+
+    async def reclaim_space(self) -> int:
+        size = "SELECT pg_database_size(current_database()) / current_setting('block_size')::int"
+        pages_before = await self.pool.fetchval(size)
+        # VACUUM can't run in a transaction, asyncpg runs it in autocommit.
+        await self.pool.execute("VACUUM (ANALYZE)")
+        pages_after = await self.pool.fetchval(size)
+        # The stats and visibility maps VACUUM writes can make the database grow a bit.
+        return max(pages_before - pages_after, 0)
+
+    def publish_invalidation(self, chat_id: int | None):
+        payload = f"{self._instance_id} {'' if chat_id is None else chat_id}"
+        task = asyncio.create_task(
+            self.pool.execute("SELECT pg_notify($1, $2)", INVALIDATION_CHANNEL, payload)
+        )
+        self._notify_tasks.add(task)
+        task.add_done_callback(self._notify_done)
+
+    def _notify_done(self, task: asyncio.Task):
+        self._notify_tasks.discard(task)
+        if not task.cancelled() and task.exception() is not None:
+            logger.opt(exception=task.exception()).error("Unable to publish a cache invalidation.")
+
+    def _on_invalidation(self, conn: asyncpg.Connection, pid: int, channel: str, payload: str):
+        instance_id, _, chat_id = payload.partition(" ")
+        # Our own notifications, the caches were already invalidated.
+        if instance_id == self._instance_id:
+            return
+
+        for callback in self._invalidation_listeners:
+            callback(int(chat_id) if chat_id else None)
@@ -0,0 +1,293 @@
+# SPDX-License-Identifier: MIT
+# Copyright (c) 2018-2024 Amano LLC
+
+from __future__ import annotations
+
+import asyncio
+import sqlite3
+from collections import deque
+from collections.abc import AsyncIterator, Callable, Iterable, Sequence
+from contextlib import asynccontextmanager
+from pathlib import Path
+from typing import Any, TypeVar
+
+from loguru import logger
+
+import aiosqlite
+
+from ..backup import backup_loop
+from ..maintenance import enable_incremental_vacuum, maintenance_loop
+from ..migrations import migrate
+from ..stats import instrumented
+from .base import Backend
+
+# Writes are grouped into a single transaction, which is committed
+# once it is this old (in seconds) or holds this many statements.
+COMMIT_MAX_DELAY = 0.05
+COMMIT_MAX_PENDING = 100
+
+# Number of read-only connections, so reads don't queue behind the writer.
+READER_POOL_SIZE = 2
+
+T = TypeVar("T")
+
+
+class SQLiteBackend(Backend):
+    Error = sqlite3.Error
+
+    def __init__(self, path: str):
+        super().__init__()
+        self.conn: aiosqlite.Connection = None
+        self.path: str = path
+        self.pool_size: int = READER_POOL_SIZE
+
+        self._readers: list[aiosqlite.Connection] = []
+        self._idle_readers: list[aiosqlite.Connection] = []
+        self._reader_waiters: deque[asyncio.Future[aiosqlite.Connection]] = deque()
+
+        self._pending: int = 0
+        self._commit_waiters: list[asyncio.Future] = []
+        self._commit_handle: asyncio.TimerHandle | None = None
+        self._flush_tasks: set[asyncio.Task] = set()
+        self._maintenance_task: asyncio.Task | None = None
+        self._backup_task: asyncio.Task | None = None
+
+    async def connect(self):
+        # Open the connection
+        conn = await aiosqlite.connect(self.path)
+
+        # Free pages are reclaimed in the background, see maintenance.py
+        await enable_incremental_vacuum(conn)
+
+        # Create or update the tables
+        await migrate(conn)
+
+        # Enable WAL
+        await conn.execute("PRAGMA journal_mode=WAL")
+
+        # Update the database
+        await conn.commit()
+
+        conn.row_factory = aiosqlite.Row
+
+        # Open the read-only connections, WAL lets them read while the writer writes
+        uri = f"{Path(self.path).resolve().as_uri()}?mode=ro"
+        for _ in range(self.pool_size):
+            reader = await aiosqlite.connect(uri, uri=True)
+            reader.row_factory = aiosqlite.Row
+            self._readers.append(reader)
+            self._idle_readers.append(reader)
+
+        self.conn = conn
+        self.is_connected: bool = True
+
+        self._maintenance_task = asyncio.create_task(maintenance_loop(self))
+        self._backup_task = asyncio.create_task(backup_loop(self))
+
+        logger.info("The database has been connected.")
+
+    async def close(self):
+        self._maintenance_task.cancel()
+        self._backup_task.cancel()
+
+        # Commit what is still pending, then close the connection
+        await self.flush()
+        for reader in self._readers:
+            await reader.close()
+        self._readers.clear()
+        self._idle_readers.clear()
+        await self.conn.close()
+
+        self.is_connected: bool = False
+
+        logger.info("The database was closed.")
+
+    def get_conn(self) -> aiosqlite.Connection:
+        if not self.is_connected:
+            raise RuntimeError("The database is not connected.")
+
+        return self.conn
+
+    @asynccontextmanager
+    async def _reader(self) -> AsyncIterator[aiosqlite.Connection]:
+        if not self._readers:
+            yield self.conn
+            return
+
+        if self._idle_readers:
+            reader = self._idle_readers.pop()
+        else:
+            waiter = asyncio.get_running_loop().create_future()
+            self._reader_waiters.append(waiter)
+            try:
+                reader = await waiter
+            except asyncio.CancelledError:
+                # It may have been handed a reader just before being cancelled.
+                if waiter.done() and not waiter.cancelled():
+                    self._release_reader(waiter.result())
+                raise
+
+        try:
+            yield reader
+        finally:
+            self._release_reader(reader)
+
+    def _release_reader(self, reader: aiosqlite.Connection):
+        # Handed to the longest waiting read, or one releasing its reader and
+        # reading again right away could keep it from the others for good.
+        while self._reader_waiters:
+            waiter = self._reader_waiters.popleft()
+            if not waiter.done():
+                waiter.set_result(reader)
+                return
+        self._idle_readers.append(reader)
+
+    @instrumented
+    async def fetchall(
+        self, sql: str, parameters: Iterable[Any] = (), *, writer: bool = False
+    ) -> list[aiosqlite.Row]:
+        # The read-only connections only see committed data, not the group commit.
+        if writer:
+            return list(await self.conn.execute_fetchall(sql, parameters))
+
+        async with self._reader() as conn:
+            return list(await conn.execute_fetchall(sql, parameters))
+
+    @instrumented
+    async def execute(
+        self, sql: str, parameters: Iterable[Any] = (), *, wait: bool = False
+    ) -> int:
+        """Run a write statement as part of the current group commit.
+
+        The statement runs right away on the writer connection, but it is only
+        committed, and so visible to the read-only connections, together with the
+        other writes made around the same time.
+
+        Parameters
+        ----------
+        sql: str
+            The statement to run.
+        parameters: Iterable[Any]
+            The statement parameters.
+        wait: bool
+            Whether to wait until the statement has been committed to disk.
+
+        Returns
+        -------
+        int
+            The number of rows changed by the statement.
+        """
+        return await self.run_sync(lambda conn: conn.execute(sql, parameters).rowcount, wait=wait)
+
+    @instrumented
+    async def run_batch(
+        self, statements: Sequence[tuple[str, Iterable[Any]]], *, wait: bool = False
+    ) -> list[list[aiosqlite.Row]]:
+        def batch(conn: sqlite3.Connection) -> list[list[aiosqlite.Row]]:
+            return [conn.execute(sql, parameters).fetchall() for sql, parameters in statements]
+
+        return await self.run_sync(batch, wait=wait)
+
+    async def run_sync(
+        self, fn: Callable[[sqlite3.Connection], T], *, wait: bool = False
+    ) -> T:
+        """Run ``fn`` with the writer connection on its thread, in a single handoff.
+
+        Whatever ``fn`` writes is part of the current group commit, and is rolled back
+        if it raises. It must not commit, and should be quick, as it holds the writer.
+        """
+        # aiosqlite has no public way to run a function on the connection thread,
+        # and a hop per statement would undo the batching. Its version is pinned.
+        result = await self.conn._execute(self._atomic, fn)
+        self._pending += 1
+
+        waiter = None
+        if wait:
+            waiter = asyncio.get_running_loop().create_future()
+            self._commit_waiters.append(waiter)
+
+        if self._pending >= COMMIT_MAX_PENDING:
+            self._flush_soon()
+        elif self._commit_handle is None:
+            self._commit_handle = asyncio.get_running_loop().call_later(
+                COMMIT_MAX_DELAY, self._flush_soon
+            )
+
+        if waiter is not None:
+            await waiter
+        return result
+
+    def _atomic(self, fn: Callable[[sqlite3.Connection], T]) -> T:
+        # Runs on the writer thread. The savepoint lets fn be undone without
+        # rolling back the rest of the group commit.
+        conn = self.conn._conn
+        if not conn.in_transaction:
+            conn.execute("BEGIN")
+        conn.execute("SAVEPOINT batch")
+        try:
+            result = fn(conn)
+        except BaseException:
+            conn.execute("ROLLBACK TO batch")
+            conn.execute("RELEASE batch")
+            raise
+        conn.execute("RELEASE batch")
+        return result
+
+    async def flush(self):
+        if self._commit_handle is not None:
+            self._commit_handle.cancel()
+            self._commit_handle = None
+
+        waiters, self._commit_waiters = self._commit_waiters, []
+        self._pending = 0
+
+        try:
+            await self.conn.commit()
+        except Exception as e:
+            for waiter in waiters:
+                if not waiter.done():
+                    waiter.set_exception(e)
+            raise
+
+        for waiter in waiters:
+            if not waiter.done():
+                waiter.set_result(None)
+
+    def _flush_soon(self):
+        if self._commit_handle is not None:
+            self._commit_handle.cancel()
+            self._commit_handle = None
+
+        task = asyncio.create_task(self._background_flush())
+        self._flush_tasks.add(task)
+        task.add_done_callback(self._flush_tasks.discard)
+
+    async def _background_flush(self):
+        try:
+            await self.flush()
+        except Exception:
+            logger.exception("Unable to commit the pending writes.")
+
+    async def reclaim_space(self) -> int:
+        conn = self.get_conn()
+        # The group commit goes first, so the pages it frees are reclaimed too.
+        await self.flush()
+        (pages_before,) = (await conn.execute_fetchall("PRAGMA page_count"))[0]
+        await self.run_sync(_incremental_vacuum)
+        await self.flush()
+        await conn.execute_fetchall("PRAGMA optimize")
+        await conn.execute_fetchall("PRAGMA wal_checkpoint(TRUNCATE)")
+        (pages_after,) = (await conn.execute_fetchall("PRAGMA page_count"))[0]
+        return pages_before - pages_after
+
+
+def _incremental_vacuum(conn: sqlite3.Connection):
+    # sqlite3 steps a PRAGMA once, which frees a single page, so it's run again for each
+    # of them. On a single cursor, as an unfinished statement would keep the savepoint open.
+    (free_pages,) = conn.execute("PRAGMA freelist_count").fetchone()
+    cursor = conn.cursor()
+    try:
+        for _ in range(free_pages):
+            cursor.execute("PRAGMA incremental_vacuum")
+    finally:
+        cursor.close()
@@ -0,0 +1,124 @@
+# SPDX-License-Identifier: MIT
+# Copyright (c) 2025 Elinsrc
+
+from __future__ import annotations
+
+import asyncio
+import gzip
+import shutil
+import time
+from datetime import UTC, datetime
+from pathlib import Path
+from typing import TYPE_CHECKING
+
+from loguru import logger
+
+import aiosqlite
+
+if TYPE_CHECKING:
+    from .backends import SQLiteBackend
+
+# How often a backup is taken, in seconds, and how many of them are kept.
+BACKUP_INTERVAL = 24 * 60 * 60
+BACKUP_KEEP = 7
+
+# The backups are kept in this directory, next to the database.
+BACKUP_DIRECTORY = "backups"
+
+# Pages copied at once, and the pause between two steps so the disk isn't hogged.
+BACKUP_PAGES_PER_STEP = 256
+BACKUP_STEP_SLEEP = 0.005
+
+
+def backup_directory(db: SQLiteBackend) -> Path:
+    return Path(db.path).resolve().parent / BACKUP_DIRECTORY
+
+
+def list_backups(db: SQLiteBackend) -> list[Path]:
+    """The backups of the database, from the oldest to the newest."""
+    return sorted(backup_directory(db).glob(f"{Path(db.path).stem}-*.db.gz"))
+
+
+def _compress(source: Path, destination: Path):
+    with source.open("rb") as src, gzip.open(destination, "wb") as dst:
+        shutil.copyfileobj(src, dst)
+
+
+async def create_backup(db: SQLiteBackend) -> Path:
+    """Take a consistent, gzipped snapshot of the database while the bot keeps writing to it.
+
+    The backup API of SQLite writes to a database, not a stream, so the snapshot is
+    kept uncompressed next to the database until it has been gzipped.
+
+    Returns
+    -------
+    Path
+        The path of the compressed backup.
+    """
+    started = time.perf_counter()
+
+    directory = backup_directory(db)
+    directory.mkdir(exist_ok=True)
+
+    # Room for the snapshot and its archive, which is no larger, before filling the disk.
+    wal = Path(f"{db.path}-wal")
+    size = Path(db.path).stat().st_size + (wal.stat().st_size if wal.exists() else 0)
+    free = shutil.disk_usage(directory).free
+    if free < size * 2:
+        raise OSError(
+            f"Not enough free space for a backup, {size * 2 / 1024:.0f} KiB are needed"
+            f" but only {free / 1024:.0f} KiB are free."
+        )
+
+    stamp = datetime.now(UTC).strftime("%Y%m%d-%H%M%S")
+    snapshot = directory / f"{Path(db.path).stem}-{stamp}.db"
+    archive = snapshot.with_name(f"{snapshot.name}.gz")
+
+    # Include the writes still waiting for the group commit.
+    await db.flush()
+
+    # A connection of its own, so the copy runs on its own thread and not the writer's.
+    source = await aiosqlite.connect(f"{Path(db.path).resolve().as_uri()}?mode=ro", uri=True)
+    target = await aiosqlite.connect(snapshot)
+    try:
+        # Hold a read transaction, the backup then copies the WAL snapshot it sees, page
+        # by page. Otherwise, every commit of the writer restarts it from the first page.
+        await source.execute("BEGIN")
+        await source.execute_fetchall("SELECT 1 FROM sqlite_schema LIMIT 1")
+        await source.backup(target, pages=BACKUP_PAGES_PER_STEP, sleep=BACKUP_STEP_SLEEP)
+    finally:
+        await target.close()
+        await source.close()
+
+    try:
+        await asyncio.to_thread(_compress, snapshot, archive)
+    except BaseException:
+        archive.unlink(missing_ok=True)
+        raise
+    finally:
+        snapshot.unlink(missing_ok=True)
+
+    # Drop the oldest backups.
+    for old in list_backups(db)[:-BACKUP_KEEP]:
+        old.unlink()
+
+    logger.info(
+        f"Backed up the database to {archive.name} in {time.perf_counter() - started:.2f}s"
+        f" ({archive.stat().st_size / 1024:.0f} KiB)."
+    )
+    return archive
+
+
+async def backup_loop(db: SQLiteBackend):
+    # Resume the schedule from the last backup, the bot may have been restarted since.
+    backups = list_backups(db)
+    last = backups[-1].stat().st_mtime if backups else time.time()
+    delay = max(last + BACKUP_INTERVAL - time.time(), 0)
+
+    while True:
+        await asyncio.sleep(delay)
+        delay = BACKUP_INTERVAL
+        try:
+            await create_backup(db)
+        except Exception:
+            logger.exception("The database backup failed.")
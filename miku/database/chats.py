@@ -1,42 +1,160 @@
 # SPDX-License-Identifier: MIT
 # Copyright (c) 2018-2024 Amano LLC
 
+from __future__ import annotations
+
+import math
+from dataclasses import dataclass
+
 from hydrogram.enums import ChatType
+from loguru import logger
 
 from miku.database import database
+from miku.utils.cache import TTLCache
 from miku.utils.consts import GROUP_TYPES
 
-conn = database.get_conn()
+from .settings import get_chat_settings
+
+# How many chats have their type kept in memory. A chat never changes type, a
+# group upgraded to a supergroup gets a new ID, so the entries don't expire.
+CHAT_TYPES_CACHE_SIZE = 65536
+
+chat_types = TTLCache(CHAT_TYPES_CACHE_SIZE, math.inf)
+
+# The IDs of every chat registered in the database, so check_chat doesn't have to ask it.
+known_chats: set[int] = set()
+known_chats_hits = 0
+known_chats_misses = 0
+
+
+@dataclass(frozen=True)
+class ChatContext:
+    """What the handlers need to know about a chat for every update."""
+
+    exists: bool
+    lang: str | None = None
+    antispam: bool = False
+    delservicemsgs: bool = False
+    antichannelpin: bool = False
+
+
+def remember_chat_type(chat_id: int, chat_type: ChatType):
+    chat_types.set(chat_id, chat_type)
+
+
+async def get_chat_type(chat_id: int) -> ChatType | None:
+    """The type of a chat the bot knows, from memory or the chat tables. None if it's unknown."""
+    chat_type = chat_types.get(chat_id)
+    if chat_type is not None:
+        return chat_type
+
+    row = await database.fetchone(
+        "SELECT 'user' FROM users WHERE user_id = ? "
+        "UNION ALL SELECT 'group' FROM groups WHERE chat_id = ? "
+        "UNION ALL SELECT 'channel' FROM channels WHERE chat_id = ?",
+        (chat_id, chat_id, chat_id),
+    )
+    if row is None:
+        return None
+
+    if row[0] == "user":
+        chat_type = ChatType.PRIVATE
+    elif row[0] == "channel":
+        chat_type = ChatType.CHANNEL
+    # Both kinds of groups share a table, only supergroups have the -100 prefix.
+    elif str(chat_id).startswith("-100"):
+        chat_type = ChatType.SUPERGROUP
+    else:
+        chat_type = ChatType.GROUP
+
+    remember_chat_type(chat_id, chat_type)
+    return chat_type
+
+
+async def load_known_chats():
+    """Fill known_chats from the chat tables, the bot calls it at startup."""
+    rows = await database.fetchall(
+        "SELECT user_id FROM users UNION ALL SELECT chat_id FROM groups "
+        "UNION ALL SELECT chat_id FROM channels"
+    )
+    known_chats.update(row[0] for row in rows)
+    logger.info(f"Loaded {len(known_chats)} known chats.")
+
+
+def is_known_chat(chat_id: int) -> bool:
+    global known_chats_hits, known_chats_misses  # noqa: PLW0603
+    if chat_id in known_chats:
+        known_chats_hits += 1
+        return True
+    known_chats_misses += 1
+    return False
 
 
 async def add_chat(chat_id, chat_type):
+    remember_chat_type(chat_id, chat_type)
+
+    # Another handler or bot process may have just added it, that's fine.
     if chat_type == ChatType.PRIVATE:
-        await conn.execute("INSERT INTO users (user_id) values (?)", (chat_id,))
-        await conn.commit()
+        await database.execute(
+            "INSERT INTO users (user_id) VALUES (?) ON CONFLICT DO NOTHING", (chat_id,), wait=True
+        )
     elif chat_type in GROUP_TYPES:  # groups and supergroups share the same table
-        await conn.execute(
-            "INSERT INTO groups (chat_id,welcome_enabled) values (?,?)", (chat_id, True)
+        await database.execute(
+            "INSERT INTO groups (chat_id, welcome_enabled) VALUES (?, ?) ON CONFLICT DO NOTHING",
+            (chat_id, True),
+            wait=True,
         )
-        await conn.commit()
     elif chat_type == ChatType.CHANNEL:
-        await conn.execute("INSERT INTO channels (chat_id) values (?)", (chat_id,))
-        await conn.commit()
+        await database.execute(
+            "INSERT INTO channels (chat_id) VALUES (?) ON CONFLICT DO NOTHING", (chat_id,), wait=True
+        )
     else:
         raise TypeError(f"Unknown chat type '{chat_type}'.")
+
+    known_chats.add(chat_id)
     return True
 
 
+async def get_chat_context(chat_id: int, chat_type: ChatType) -> ChatContext:
+    # Every update goes through here, which keeps the chat types up to date.
+    remember_chat_type(chat_id, chat_type)
+
+    if chat_type in GROUP_TYPES:  # groups and supergroups share the same table
+        # A single query joining groups and antispam, cached with the chat settings.
+        settings = await get_chat_settings(chat_id)
+        if settings is None:
+            return ChatContext(exists=False)
+        return ChatContext(
+            exists=True,
+            lang=settings.chat_lang,
+            antispam=bool(settings.antispam_enabled),
+            delservicemsgs=bool(settings.delservicemsgs),
+            antichannelpin=bool(settings.antichannelpin),
+        )
+    if chat_type == ChatType.PRIVATE:
+        row = await database.fetchone("SELECT chat_lang FROM users WHERE user_id = ?", (chat_id,))
+    elif chat_type == ChatType.CHANNEL:
+        row = await database.fetchone(
+            "SELECT chat_lang FROM channels WHERE chat_id = ?", (chat_id,)
+        )
+    else:
+        raise TypeError(f"Unknown chat type '{chat_type}'.")
+
+    if row is None:
+        return ChatContext(exists=False)
+    return ChatContext(exists=True, lang=row[0])
+
+
 async def chat_exists(chat_id, chat_type):
     if chat_type == ChatType.PRIVATE:
-        cursor = await conn.execute("SELECT user_id FROM users where user_id = ?", (chat_id,))
-        row = await cursor.fetchone()
+        row = await database.fetchone("SELECT user_id FROM users where user_id = ?", (chat_id,))
         return bool(row)
     if chat_type in GROUP_TYPES:  # groups and supergroups share the same table
-        cursor = await conn.execute("SELECT chat_id FROM groups where chat_id = ?", (chat_id,))
-        row = await cursor.fetchone()
+        row = await database.fetchone("SELECT chat_id FROM groups where chat_id = ?", (chat_id,))
         return bool(row)
     if chat_type == ChatType.CHANNEL:
-        cursor = await conn.execute("SELECT chat_id FROM channels where chat_id = ?", (chat_id,))
-        row = await cursor.fetchone()
+        row = await database.fetchone(
+            "SELECT chat_id FROM channels where chat_id = ?", (chat_id,)
+        )
         return bool(row)
     raise TypeError(f"Unknown chat type '{chat_type}'.")
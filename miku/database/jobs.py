@@ -0,0 +1,87 @@
+# SPDX-License-Identifier: MIT
+# Copyright (c) 2025 Elinsrc
+
+from __future__ import annotations
+
+import time
+
+from .core import database
+
+# A job is "queued" until a worker claims it, "running" while the worker holds
+# its lease, and "failed" once it ran out of attempts. Finished jobs are deleted.
+# run_at is when a queued job is due, or when the lease of a running one ends.
+
+
+async def add_job(kind: str, payload: str) -> int:
+    # Waits for the commit, so the job survives the bot being stopped right after.
+    ((row,),) = await database.run_batch(
+        (
+            (
+                "INSERT INTO jobs (kind, payload, run_at) VALUES (?, ?, ?) RETURNING id",
+                (kind, payload, time.time()),
+            ),
+        ),
+        wait=True,
+    )
+    return row[0]
+
+
+async def get_due_jobs(limit: int) -> list[tuple[int, str, str, int, str | None]]:
+    # Running jobs whose lease ended were left behind by a stopped or crashed bot.
+    return await database.fetchall(
+        "SELECT id, kind, payload, attempts, progress FROM jobs "
+        "WHERE status != 'failed' AND run_at <= ? ORDER BY run_at LIMIT ?",
+        (time.time(), limit),
+    )
+
+
+async def claim_job(job_id: int, lease: float) -> bool:
+    """Take the lease of a due job, False if another worker was faster."""
+    now = time.time()
+    return bool(
+        await database.execute(
+            "UPDATE jobs SET status = 'running', attempts = attempts + 1, run_at = ? "
+            "WHERE id = ? AND status != 'failed' AND run_at <= ?",
+            (now + lease, job_id, now),
+        )
+    )
+
+
+async def renew_job(job_id: int, lease: float):
+    await database.execute("UPDATE jobs SET run_at = ? WHERE id = ?", (time.time() + lease, job_id))
+
+
+async def set_job_progress(job_id: int, progress: str):
+    await database.execute("UPDATE jobs SET progress = ? WHERE id = ?", (progress, job_id))
+
+
+async def finish_job(job_id: int):
+    await database.execute("DELETE FROM jobs WHERE id = ?", (job_id,))
+
+
+async def retry_job(job_id: int, delay: float, error: str):
+    await database.execute(
+        "UPDATE jobs SET status = 'queued', run_at = ?, error = ? WHERE id = ?",
+        (time.time() + delay, error, job_id),
+    )
+
+
+async def release_job(job_id: int):
+    """Put a job interrupted by the bot stopping back in the queue, without using an attempt."""
+    await database.execute(
+        "UPDATE jobs SET status = 'queued', attempts = attempts - 1, run_at = ? WHERE id = ?",
+        (time.time(), job_id),
+        wait=True,
+    )
+
+
+async def fail_job(job_id: int, error: str):
+    await database.execute(
+        "UPDATE jobs SET status = 'failed', run_at = ?, error = ? WHERE id = ?",
+        (time.time(), error, job_id),
+    )
+
+
+async def get_job_counts() -> dict[str, int]:
+    rows = await database.fetchall("SELECT status, COUNT(*) FROM jobs GROUP BY status")
+    return {status: count for status, count in rows}
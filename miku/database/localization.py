@@ -3,43 +3,65 @@
 
 from hydrogram.enums import ChatType
 
+from miku.utils.cache import TTLCache
 from miku.utils.consts import GROUP_TYPES
 
 from .core import database
+from .settings import get_chat_settings, invalidate_chat_settings
 
-conn = database.get_conn()
+# How many chats have their resolved language kept in memory and for how long (in seconds).
+LANG_CACHE_SIZE = 8192
+LANG_CACHE_TTL = 600
+
+# The locale get_lang() resolved for a chat, by chat ID, then by chat type and
+# the language_code of the user. See miku.utils.localization.
+resolved_lang_cache = TTLCache(LANG_CACHE_SIZE, LANG_CACHE_TTL)
 
 
 async def set_db_lang(chat_id: int, chat_type: str, lang_code: str):
     if chat_type in {ChatType.PRIVATE, ChatType.BOT}:
-        await conn.execute(
-            "UPDATE users SET chat_lang = ? WHERE user_id = ?", (lang_code, chat_id)
+        await database.execute(
+            "UPDATE users SET chat_lang = ? WHERE user_id = ?", (lang_code, chat_id), wait=True
         )
-        await conn.commit()
     elif chat_type in GROUP_TYPES:  # groups and supergroups share the same table
-        await conn.execute(
-            "UPDATE groups SET chat_lang = ? WHERE chat_id = ?", (lang_code, chat_id)
+        await database.execute(
+            "UPDATE groups SET chat_lang = ? WHERE chat_id = ?", (lang_code, chat_id), wait=True
         )
-        await conn.commit()
+        invalidate_chat_settings(chat_id)
     elif chat_type == ChatType.CHANNEL:
-        await conn.execute(
-            "UPDATE channels SET chat_lang = ? WHERE chat_id = ?", (lang_code, chat_id)
+        await database.execute(
+            "UPDATE channels SET chat_lang = ? WHERE chat_id = ?", (lang_code, chat_id), wait=True
         )
-        await conn.commit()
     else:
         raise TypeError(f"Unknown chat type '{chat_type}'.")
 
+    # Also lets the other processes drop their cached settings and language.
+    invalidate_lang(chat_id)
+    if chat_type not in GROUP_TYPES:
+        database.publish_invalidation(chat_id)
+
+
+def invalidate_lang(chat_id: int | None = None) -> None:
+    """Drop the resolved language of a chat, or of every chat if ``chat_id`` is None."""
+    if chat_id is None:
+        resolved_lang_cache.clear()
+    else:
+        resolved_lang_cache.pop(chat_id)
+
+
+database.add_invalidation_listener(invalidate_lang)
+
 
 async def get_db_lang(chat_id: int, chat_type: ChatType) -> str:
     if chat_type == ChatType.PRIVATE:
-        cursor = await conn.execute("SELECT chat_lang FROM users WHERE user_id = ?", (chat_id,))
-        ul = await cursor.fetchone()
+        ul = await database.fetchone("SELECT chat_lang FROM users WHERE user_id = ?", (chat_id,))
     elif chat_type in GROUP_TYPES:  # groups and supergroups share the same table
-        cursor = await conn.execute("SELECT chat_lang FROM groups WHERE chat_id = ?", (chat_id,))
-        ul = await cursor.fetchone()
+        settings = await get_chat_settings(chat_id)
+        return settings.chat_lang if settings else None
     elif chat_type == ChatType.CHANNEL:
-        cursor = await conn.execute("SELECT chat_lang FROM channels WHERE chat_id = ?", (chat_id,))
-        ul = await cursor.fetchone()
+        ul = await database.fetchone(
+            "SELECT chat_lang FROM channels WHERE chat_id = ?", (chat_id,)
+        )
     else:
         raise TypeError(f"Unknown chat type '{chat_type}'.")
 
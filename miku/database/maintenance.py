@@ -0,0 +1,96 @@
+# SPDX-License-Identifier: MIT
+# Copyright (c) 2025 Elinsrc
+
+from __future__ import annotations
+
+import asyncio
+import time
+from dataclasses import dataclass
+from typing import TYPE_CHECKING
+
+from loguru import logger
+
+if TYPE_CHECKING:
+    import aiosqlite
+
+    from .backends import Backend
+
+# How often the maintenance runs, in seconds.
+MAINTENANCE_INTERVAL = 6 * 60 * 60
+
+# PRAGMA auto_vacuum value for incremental mode.
+AUTO_VACUUM_INCREMENTAL = 2
+
+# Rows that can't be reached anymore: warns and antispam settings of chats the
+# bot isn't registered in.
+PRUNE_STATEMENTS: tuple[str, ...] = (
+    "DELETE FROM user_warns WHERE count <= 0 OR chat_id NOT IN (SELECT chat_id FROM groups)",
+    "DELETE FROM antispam WHERE chat_id NOT IN (SELECT chat_id FROM groups)",
+)
+
+# Failed jobs are kept this long (in seconds), to look into them.
+FAILED_JOBS_KEEP = 7 * 24 * 60 * 60
+
+# The warns of the users who left a chat are kept this long (in seconds), so
+# leaving and joining again soon after doesn't clear them.
+LEFT_WARNS_KEEP = 30 * 24 * 60 * 60
+
+
+@dataclass(frozen=True)
+class MaintenanceReport:
+    duration: float
+    pruned_rows: int
+    reclaimed_pages: int
+
+
+async def enable_incremental_vacuum(conn: aiosqlite.Connection):
+    """Switch the database to incremental auto-vacuum, which only takes a full VACUUM once."""
+    cursor = await conn.execute("PRAGMA auto_vacuum")
+    (mode,) = await cursor.fetchone()
+    await cursor.close()
+
+    if mode == AUTO_VACUUM_INCREMENTAL:
+        return
+
+    logger.info("Switching the database to incremental auto-vacuum, this may take a while.")
+    await conn.execute(f"PRAGMA auto_vacuum = {AUTO_VACUUM_INCREMENTAL}")
+    await conn.execute("VACUUM")
+
+
+async def run_maintenance(db: Backend) -> MaintenanceReport:
+    """Prune dead rows, give the free pages back to the OS, and refresh the query planner stats."""
+    started = time.perf_counter()
+
+    pruned_rows = 0
+    for sql in PRUNE_STATEMENTS:
+        pruned_rows += await db.execute(sql)
+    pruned_rows += await db.execute(
+        "DELETE FROM jobs WHERE status = 'failed' AND run_at < ?",
+        (time.time() - FAILED_JOBS_KEEP,),
+    )
+    pruned_rows += await db.execute(
+        "DELETE FROM user_warns WHERE left_at < ?", (time.time() - LEFT_WARNS_KEEP,)
+    )
+    await db.flush()
+
+    reclaimed_pages = await db.reclaim_space()
+
+    report = MaintenanceReport(
+        duration=time.perf_counter() - started,
+        pruned_rows=pruned_rows,
+        reclaimed_pages=reclaimed_pages,
+    )
+    logger.info(
+        f"Database maintenance took {report.duration:.2f}s, pruned {report.pruned_rows} rows"
+        f" and reclaimed {report.reclaimed_pages} pages."
+    )
+    return report
+
+
+async def maintenance_loop(db: Backend):
+    while True:
+        await asyncio.sleep(MAINTENANCE_INTERVAL)
+        try:
+            await run_maintenance(db)
+        except Exception:
+            logger.exception("The database maintenance failed.")
@@ -0,0 +1,216 @@
+# SPDX-License-Identifier: MIT
+# Copyright (c) 2025 Elinsrc
+
+from __future__ import annotations
+
+from typing import TYPE_CHECKING
+
+from loguru import logger
+
+if TYPE_CHECKING:
+    import aiosqlite
+    import asyncpg
+
+# Each script brings the schema one version up, the current version is kept
+# in PRAGMA user_version. Never edit an existing script, append a new one.
+MIGRATIONS: list[str] = [
+    # 1: The original schema, databases created before migrations already have it.
+    """
+    CREATE TABLE IF NOT EXISTS groups(
+        chat_id INTEGER PRIMARY KEY,
+        welcome TEXT,
+        welcome_enabled INTEGER,
+        rules TEXT,
+        warns_limit INTEGER,
+        chat_lang TEXT,
+        cached_admins,
+        antichannelpin INTEGER,
+        delservicemsgs INTEGER,
+        warn_action TEXT
+    );
+
+    CREATE TABLE IF NOT EXISTS users(
+        user_id INTEGER PRIMARY KEY,
+        chat_lang TEXT
+    );
+
+    CREATE TABLE IF NOT EXISTS channels(
+        chat_id INTEGER PRIMARY KEY
+    );
+
+    CREATE TABLE IF NOT EXISTS was_restarted_at(
+        chat_id INTEGER,
+        message_id INTEGER
+    );
+
+    CREATE TABLE IF NOT EXISTS user_warns(
+        user_id INTEGER,
+        chat_id INTEGER,
+        count INTEGER
+    );
+
+    CREATE TABLE IF NOT EXISTS antispam(
+        chat_id INTEGER PRIMARY KEY,
+        antispam_enabled INTEGER
+    );
+    """,
+    # 2: Key user_warns by (chat_id, user_id), merging duplicated rows, give
+    # cached_admins a type and add the missing channels.chat_lang column.
+    """
+    CREATE TABLE user_warns_new(
+        chat_id INTEGER NOT NULL,
+        user_id INTEGER NOT NULL,
+        count INTEGER NOT NULL DEFAULT 0,
+        PRIMARY KEY (chat_id, user_id)
+    ) WITHOUT ROWID;
+
+    INSERT INTO user_warns_new (chat_id, user_id, count)
+    SELECT chat_id, user_id, SUM(count) FROM user_warns
+    WHERE chat_id IS NOT NULL AND user_id IS NOT NULL
+    GROUP BY chat_id, user_id;
+
+    DROP TABLE user_warns;
+    ALTER TABLE user_warns_new RENAME TO user_warns;
+
+    CREATE TABLE groups_new(
+        chat_id INTEGER PRIMARY KEY,
+        welcome TEXT,
+        welcome_enabled INTEGER,
+        rules TEXT,
+        warns_limit INTEGER,
+        chat_lang TEXT,
+        cached_admins TEXT,
+        antichannelpin INTEGER,
+        delservicemsgs INTEGER,
+        warn_action TEXT
+    );
+
+    INSERT INTO groups_new SELECT
+        chat_id, welcome, welcome_enabled, rules, warns_limit, chat_lang,
+        cached_admins, antichannelpin, delservicemsgs, warn_action
+    FROM groups;
+
+    DROP TABLE groups;
+    ALTER TABLE groups_new RENAME TO groups;
+
+    ALTER TABLE channels ADD COLUMN chat_lang TEXT;
+    """,
+    # 3: The background jobs, see miku.jobs.
+    """
+    CREATE TABLE jobs(
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        kind TEXT NOT NULL,
+        payload TEXT NOT NULL,
+        status TEXT NOT NULL DEFAULT 'queued',
+        attempts INTEGER NOT NULL DEFAULT 0,
+        run_at REAL NOT NULL,
+        progress TEXT,
+        error TEXT
+    );
+
+    CREATE INDEX jobs_due ON jobs (run_at) WHERE status != 'failed';
+    """,
+    # 4: When the warned users left their chat, to prune their warns.
+    """
+    ALTER TABLE user_warns ADD COLUMN left_at REAL;
+    """,
+]
+
+
+# The same schema on PostgreSQL, whose version is kept in the schema_version
+# table. Telegram IDs don't fit in 32 bits, hence the BIGINT columns.
+POSTGRES_MIGRATIONS: list[str] = [
+    # 1: The schema of the SQLite migration 2.
+    """
+    CREATE TABLE groups(
+        chat_id BIGINT PRIMARY KEY,
+        welcome TEXT,
+        welcome_enabled INTEGER,
+        rules TEXT,
+        warns_limit INTEGER,
+        chat_lang TEXT,
+        cached_admins TEXT,
+        antichannelpin INTEGER,
+        delservicemsgs INTEGER,
+        warn_action TEXT
+    );
+
+    CREATE TABLE users(
+        user_id BIGINT PRIMARY KEY,
+        chat_lang TEXT
+    );
+
+    CREATE TABLE channels(
+        chat_id BIGINT PRIMARY KEY,
+        chat_lang TEXT
+    );
+
+    CREATE TABLE was_restarted_at(
+        chat_id BIGINT,
+        message_id BIGINT
+    );
+
+    CREATE TABLE user_warns(
+        chat_id BIGINT NOT NULL,
+        user_id BIGINT NOT NULL,
+        count INTEGER NOT NULL DEFAULT 0,
+        PRIMARY KEY (chat_id, user_id)
+    );
+
+    CREATE TABLE antispam(
+        chat_id BIGINT PRIMARY KEY,
+        antispam_enabled INTEGER
+    );
+    """,
+    # 2: The schema of the SQLite migration 3.
+    """
+    CREATE TABLE jobs(
+        id BIGSERIAL PRIMARY KEY,
+        kind TEXT NOT NULL,
+        payload TEXT NOT NULL,
+        status TEXT NOT NULL DEFAULT 'queued',
+        attempts INTEGER NOT NULL DEFAULT 0,
+        run_at DOUBLE PRECISION NOT NULL,
+        progress TEXT,
+        error TEXT
+    );
+
+    CREATE INDEX jobs_due ON jobs (run_at) WHERE status != 'failed';
+    """,
+    # 3: The schema of the SQLite migration 4.
+    """
+    ALTER TABLE user_warns ADD COLUMN left_at DOUBLE PRECISION;
+    """,
+]
+
+# Key of the advisory lock taken while migrating, so that bot processes
+# starting at the same time don't apply the same migration twice.
+POSTGRES_MIGRATIONS_LOCK = 0x4D696B75
+
+
+async def migrate(conn: aiosqlite.Connection):
+    """Apply the migrations the database is missing, each one in its own transaction."""
+    cursor = await conn.execute("PRAGMA user_version")
+    (version,) = await cursor.fetchone()
+    await cursor.close()
+
+    for number, script in enumerate(MIGRATIONS[version:], start=version + 1):
+        await conn.executescript(f"BEGIN;\n{script}\nPRAGMA user_version = {number};\nCOMMIT;")
+        logger.info(f"The database schema was migrated to version {number}.")
+
+
+async def migrate_postgres(conn: asyncpg.Connection):
+    """Same as :func:`migrate`, for PostgreSQL."""
+    async with conn.transaction():
+        await conn.execute("SELECT pg_advisory_xact_lock($1)", POSTGRES_MIGRATIONS_LOCK)
+        await conn.execute("CREATE TABLE IF NOT EXISTS schema_version(version INTEGER NOT NULL)")
+        version = await conn.fetchval("SELECT version FROM schema_version")
+        if version is None:
+            version = 0
+            await conn.execute("INSERT INTO schema_version VALUES (0)")
+
+        # PostgreSQL has transactional DDL, a failed script leaves nothing behind.
+        for number, script in enumerate(POSTGRES_MIGRATIONS[version:], start=version + 1):
+            await conn.execute(script)
+            await conn.execute("UPDATE schema_version SET version = $1", number)
+            logger.info(f"The database schema was migrated to version {number}.")
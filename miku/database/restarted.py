@@ -4,19 +4,17 @@
 
 from .core import database
 
-conn = database.get_conn()
 
-
-async def del_restarted():
-    await conn.execute("DELETE FROM was_restarted_at")
-    await conn.commit()
-
-
-async def get_restarted() -> tuple[int, int]:
-    cursor = await conn.execute("SELECT chat_id, message_id FROM was_restarted_at")
-    return await cursor.fetchone()
+async def pop_restarted() -> tuple[int, int] | None:
+    rows, _ = await database.run_batch((
+        ("SELECT chat_id, message_id FROM was_restarted_at", ()),
+        ("DELETE FROM was_restarted_at", ()),
+    ))
+    return rows[0] if rows else None
 
 
 async def set_restarted(chat_id: int, message_id: int):
-    await conn.execute("INSERT INTO was_restarted_at VALUES (?, ?)", (chat_id, message_id))
-    await conn.commit()
+    await database.run_batch((
+        ("DELETE FROM was_restarted_at", ()),
+        ("INSERT INTO was_restarted_at VALUES (?, ?)", (chat_id, message_id)),
+    ))
@@ -2,19 +2,16 @@
 # Copyright (c) 2018-2024 Amano LLC
 
 from .core import database
-
-conn = database.get_conn()
+from .settings import get_chat_settings, invalidate_chat_settings
 
 
 async def get_rules(chat_id):
-    cursor = await conn.execute("SELECT rules FROM groups WHERE chat_id = (?)", (chat_id,))
-    try:
-        row = await cursor.fetchone()
-        return row[0]
-    except IndexError:
-        return None
+    settings = await get_chat_settings(chat_id)
+    return settings.rules if settings else None
 
 
 async def set_rules(chat_id, rules):
-    await conn.execute("UPDATE groups SET rules = ? WHERE chat_id = ?", (rules, chat_id))
-    await conn.commit()
+    await database.execute(
+        "UPDATE groups SET rules = ? WHERE chat_id = ?", (rules, chat_id), wait=True
+    )
+    invalidate_chat_settings(chat_id)
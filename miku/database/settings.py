@@ -0,0 +1,76 @@
+# SPDX-License-Identifier: MIT
+# Copyright (c) 2025 Elinsrc
+
+from __future__ import annotations
+
+from dataclasses import dataclass
+
+from miku.utils.cache import TTLCache
+
+from .core import database
+
+# How many chats are kept in memory and for how long (in seconds).
+SETTINGS_CACHE_SIZE = 4096
+SETTINGS_CACHE_TTL = 600
+
+
+@dataclass(frozen=True)
+class ChatSettings:
+    """The settings of a group, as stored in the ``groups`` and ``antispam`` tables."""
+
+    chat_id: int
+    welcome: str | None
+    welcome_enabled: int | None
+    rules: str | None
+    warns_limit: int | None
+    chat_lang: str | None
+    antichannelpin: int | None
+    delservicemsgs: int | None
+    warn_action: str | None
+    antispam_enabled: int | None
+
+
+settings_cache = TTLCache(SETTINGS_CACHE_SIZE, SETTINGS_CACHE_TTL)
+
+
+async def get_chat_settings(chat_id: int) -> ChatSettings | None:
+    settings = settings_cache.get(chat_id)
+    if settings is not None:
+        return settings
+
+    # So a load racing with a write doesn't cache stale data.
+    generation = settings_cache.generation
+    row = await database.fetchone(
+        "SELECT g.chat_id, g.welcome, g.welcome_enabled, g.rules, g.warns_limit, g.chat_lang, "
+        "g.antichannelpin, g.delservicemsgs, g.warn_action, a.antispam_enabled "
+        "FROM groups g LEFT JOIN antispam a ON a.chat_id = g.chat_id WHERE g.chat_id = ?",
+        (chat_id,),
+    )
+
+    # Unknown chats are not cached, so they are visible as soon as they get added.
+    if row is None:
+        return None
+
+    settings = ChatSettings(*row)
+    settings_cache.set(chat_id, settings, generation)
+    return settings
+
+
+def invalidate_chat_settings(chat_id: int | None = None) -> None:
+    """Drop the cached settings of a chat, or of every chat if ``chat_id`` is None.
+
+    Writers must call it once their change is committed. The other processes
+    sharing the database, if any, drop them as well.
+    """
+    _forget_chat_settings(chat_id)
+    database.publish_invalidation(chat_id)
+
+
+def _forget_chat_settings(chat_id: int | None) -> None:
+    if chat_id is None:
+        settings_cache.clear()
+    else:
+        settings_cache.pop(chat_id)
+
+
+database.add_invalidation_listener(_forget_chat_settings)
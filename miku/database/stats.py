@@ -0,0 +1,209 @@
+# SPDX-License-Identifier: MIT
+# Copyright (c) 2025 Elinsrc
+
+from __future__ import annotations
+
+import bisect
+import functools
+import math
+import re
+import sys
+import time
+from collections.abc import Awaitable, Callable, Iterator, Sequence
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Any, TypeVar
+
+from loguru import logger
+
+# Queries taking longer than this (in seconds) are logged.
+SLOW_QUERY_THRESHOLD = 0.1
+
+# Upper bounds of the histogram buckets.
+LATENCY_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, math.inf)
+QUERIES_PER_UPDATE_BUCKETS = (0, 1, 2, 3, 4, 6, 8, 12, 16, 24, 32, math.inf)
+
+# Statements beyond this many (e.g. from /sql) are counted together, as "other".
+MAX_TRACKED_STATEMENTS = 256
+
+T = TypeVar("T")
+
+_whitespace = re.compile(r"\s+")
+
+# Number of queries run by the update being handled, see QueryStats.track_update.
+_update_queries: ContextVar[list[int] | None] = ContextVar("update_queries", default=None)
+
+
+class Histogram:
+    __slots__ = ("buckets", "count", "counts", "max", "sum")
+
+    def __init__(self, buckets: tuple[float, ...]):
+        self.buckets = buckets
+        self.counts = [0] * len(buckets)
+        self.count = 0
+        self.sum = 0.0
+        self.max = 0.0
+
+    def observe(self, value: float):
+        self.counts[bisect.bisect_left(self.buckets, value)] += 1
+        self.count += 1
+        self.sum += value
+        self.max = max(self.max, value)
+
+    def quantile(self, q: float) -> float:
+        """The upper bound of the bucket the ``q`` quantile falls in."""
+        rank = q * self.count
+        seen = 0
+        for bound, count in zip(self.buckets, self.counts):
+            seen += count
+            if seen >= rank and seen:
+                return min(bound, self.max)
+        return 0.0
+
+
+def _caller() -> tuple[str, str | None]:
+    """The function outside of the database layer running the query, and the plugin handler."""
+    frame = sys._getframe(2)
+    caller = None
+    handler = None
+    while frame is not None:
+        module = frame.f_globals.get("__name__", "")
+        if caller is None and not module.startswith("miku.database"):
+            caller = f"{module}.{frame.f_code.co_qualname}"
+        # The outermost plugin function is the handler.
+        if module.startswith("miku.plugins"):
+            handler = f"{module}.{frame.f_code.co_qualname}"
+        frame = frame.f_back
+    return caller or "unknown", handler
+
+
+class QueryStats:
+    """Latency and call counts of the queries, by statement, caller and handler."""
+
+    def __init__(self):
+        self.reset()
+
+    def reset(self):
+        self.since = time.time()
+        self.statements: dict[str, Histogram] = {}
+        self.callers: dict[str, Histogram] = {}
+        self.handlers: dict[str, Histogram] = {}
+        self.per_update = Histogram(QUERIES_PER_UPDATE_BUCKETS)
+        self.slow_queries = 0
+
+    def record(self, sql: str, duration: float, caller: str, handler: str | None):
+        statement = _whitespace.sub(" ", sql).strip()
+        if statement not in self.statements and len(self.statements) >= MAX_TRACKED_STATEMENTS:
+            statement = "other"
+
+        for key, histograms in ((statement, self.statements), (caller, self.callers)):
+            if key not in histograms:
+                histograms[key] = Histogram(LATENCY_BUCKETS)
+            histograms[key].observe(duration)
+
+        if handler is not None:
+            if handler not in self.handlers:
+                self.handlers[handler] = Histogram(LATENCY_BUCKETS)
+            self.handlers[handler].observe(duration)
+
+        counter = _update_queries.get()
+        if counter is not None:
+            counter[0] += 1
+
+        if duration >= SLOW_QUERY_THRESHOLD:
+            self.slow_queries += 1
+            logger.warning(f"Slow query ({duration * 1000:.0f} ms) from {caller}: {statement}")
+
+    @contextmanager
+    def track_update(self) -> Iterator[None]:
+        """Count the queries made while handling an update."""
+        counter = [0]
+        token = _update_queries.set(counter)
+        try:
+            yield
+        finally:
+            _update_queries.reset(token)
+            self.per_update.observe(counter[0])
+
+    def render_metrics(self) -> str:
+        """Export the stats in the Prometheus text format."""
+        lines = []
+        render_histogram(
+            lines,
+            "miku_db_query_duration_seconds",
+            "Time taken by the database queries.",
+            self.statements,
+            "statement",
+        )
+        render_histogram(
+            lines,
+            "miku_db_caller_query_duration_seconds",
+            "Time taken by the database queries, by calling function.",
+            self.callers,
+            "caller",
+        )
+        render_histogram(
+            lines,
+            "miku_db_handler_query_duration_seconds",
+            "Time taken by the database queries, by plugin handler.",
+            self.handlers,
+            "handler",
+        )
+        render_histogram(
+            lines,
+            "miku_db_queries_per_update",
+            "Number of database queries made to handle an update.",
+            {"": self.per_update},
+            None,
+        )
+
+        lines.append("# HELP miku_db_slow_queries_total Queries slower than the threshold.")
+        lines.append("# TYPE miku_db_slow_queries_total counter")
+        lines.append(f"miku_db_slow_queries_total {self.slow_queries}")
+        return "\n".join(lines) + "\n"
+
+
+def render_histogram(
+    lines: list[str], name: str, help_: str, series: dict[str, Histogram], label: str | None
+):
+    """Append histograms to ``lines`` in the Prometheus text format, one per ``label`` value."""
+    lines.append(f"# HELP {name} {help_}")
+    lines.append(f"# TYPE {name} histogram")
+    for key, hist in series.items():
+        labels = f'{label}="{_escape(key)}",' if label else ""
+        cumulative = 0
+        for bound, count in zip(hist.buckets, hist.counts):
+            cumulative += count
+            le = "+Inf" if bound == math.inf else repr(bound)
+            lines.append(f'{name}_bucket{{{labels}le="{le}"}} {cumulative}')
+        labels = f"{{{labels.rstrip(',')}}}" if labels else ""
+        lines.append(f"{name}_sum{labels} {hist.sum}")
+        lines.append(f"{name}_count{labels} {hist.count}")
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+query_stats = QueryStats()
+
+
+def instrumented(
+    method: Callable[..., Awaitable[T]],
+) -> Callable[..., Awaitable[T]]:
+    """Record the latency of a backend method taking the SQL (or a batch of it) first."""
+
+    @functools.wraps(method)
+    async def wrapper(self, sql: str | Sequence[tuple[str, Any]], *args: Any, **kwargs: Any) -> T:
+        # Before awaiting, while the stack still leads to the caller.
+        caller, handler = _caller()
+        started = time.perf_counter()
+        try:
+            return await method(self, sql, *args, **kwargs)
+        finally:
+            # A batch is a single round trip, recorded as one query.
+            if not isinstance(sql, str):
+                sql = "; ".join(statement for statement, _ in sql)
+            query_stats.record(sql, time.perf_counter() - started, caller, handler)
+
+    return wrapper
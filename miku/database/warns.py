@@ -3,65 +3,66 @@
 
 from __future__ import annotations
 
-from .core import database
+import time
 
-conn = database.get_conn()
+from .core import database
+from .settings import get_chat_settings, invalidate_chat_settings
 
 
 async def get_warn_action(chat_id: int) -> tuple[str | None, bool]:
-    cursor = await conn.execute("SELECT warn_action FROM groups WHERE chat_id = (?)", (chat_id,))
-    res = (await cursor.fetchone())[0]
-    return "ban" if res is None else res
+    settings = await get_chat_settings(chat_id)
+    return "ban" if settings is None or settings.warn_action is None else settings.warn_action
 
 
 async def set_warn_action(chat_id: int, action: str | None):
-    await conn.execute("UPDATE groups SET warn_action = ? WHERE chat_id = ?", (action, chat_id))
-    await conn.commit()
+    await database.execute(
+        "UPDATE groups SET warn_action = ? WHERE chat_id = ?", (action, chat_id), wait=True
+    )
+    invalidate_chat_settings(chat_id)
 
 
 async def get_warns(chat_id, user_id):
-    cursor = await conn.execute(
+    r = await database.fetchone(
         "SELECT count FROM user_warns WHERE chat_id = ? AND user_id = ?",
         (chat_id, user_id),
     )
-    r = await cursor.fetchone()
     return r[0] if r else 0
 
 
 async def add_warns(chat_id, user_id, number):
-    cursor = await conn.execute(
-        "SELECT * FROM user_warns WHERE chat_id = ? AND user_id = ?", (chat_id, user_id)
-    )
-    row = await cursor.fetchone()
-    if row:
-        await conn.execute(
-            "UPDATE user_warns SET count = count + ? WHERE chat_id = ? AND user_id = ?",
-            (number, chat_id, user_id),
-        )
-    else:
-        await conn.execute(
-            "INSERT INTO user_warns (user_id, chat_id, count) VALUES (?,?,?)",
-            (user_id, chat_id, number),
-        )
-
-    await conn.commit()
+    # Both in one go, the count is read back on the writer before being committed.
+    _, rows = await database.run_batch((
+        (
+            "INSERT INTO user_warns (chat_id, user_id, count) VALUES (?, ?, ?) "
+            "ON CONFLICT (chat_id, user_id) DO UPDATE SET count = user_warns.count + excluded.count",
+            (chat_id, user_id, number),
+        ),
+        ("SELECT count FROM user_warns WHERE chat_id = ? AND user_id = ?", (chat_id, user_id)),
+    ))
+    return rows[0][0]
 
 
 async def reset_warns(chat_id, user_id):
-    await conn.execute(
+    await database.execute(
         "DELETE FROM user_warns WHERE chat_id = ? AND user_id = ?", (chat_id, user_id)
     )
-    await conn.commit()
+
+
+async def set_warned_user_left(chat_id: int, user_id: int, left: bool):
+    """Record that a user left a chat, or joined it again, their warns are pruned after a while."""
+    await database.execute(
+        "UPDATE user_warns SET left_at = ? WHERE chat_id = ? AND user_id = ?",
+        (time.time() if left else None, chat_id, user_id),
+    )
 
 
 async def get_warns_limit(chat_id):
-    cursor = await conn.execute("SELECT warns_limit FROM groups WHERE chat_id = ?", (chat_id,))
-    res = (await cursor.fetchone())[0]
-    return 3 if res is None else res
+    settings = await get_chat_settings(chat_id)
+    return 3 if settings is None or settings.warns_limit is None else settings.warns_limit
 
 
 async def set_warns_limit(chat_id, warns_limit):
-    await conn.execute(
-        "UPDATE groups SET warns_limit = ? WHERE chat_id = ?", (warns_limit, chat_id)
+    await database.execute(
+        "UPDATE groups SET warns_limit = ? WHERE chat_id = ?", (warns_limit, chat_id), wait=True
     )
-    await conn.commit()
+    invalidate_chat_settings(chat_id)
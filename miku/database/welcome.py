@@ -4,22 +4,23 @@
 from __future__ import annotations
 
 from .core import database
-
-conn = database.get_conn()
+from .settings import get_chat_settings, invalidate_chat_settings
 
 
 async def get_welcome(chat_id: int) -> tuple[str | None, bool]:
-    cursor = await conn.execute(
-        "SELECT welcome, welcome_enabled FROM groups WHERE chat_id = (?)", (chat_id,)
-    )
-    return await cursor.fetchone()
+    settings = await get_chat_settings(chat_id)
+    return (settings.welcome, settings.welcome_enabled) if settings else None
 
 
 async def set_welcome(chat_id: int, welcome: str | None):
-    await conn.execute("UPDATE groups SET welcome = ? WHERE chat_id = ?", (welcome, chat_id))
-    await conn.commit()
+    await database.execute(
+        "UPDATE groups SET welcome = ? WHERE chat_id = ?", (welcome, chat_id), wait=True
+    )
+    invalidate_chat_settings(chat_id)
 
 
 async def toggle_welcome(chat_id: int, mode: bool):
-    await conn.execute("UPDATE groups SET welcome_enabled = ? WHERE chat_id = ?", (mode, chat_id))
-    await conn.commit()
+    await database.execute(
+        "UPDATE groups SET welcome_enabled = ? WHERE chat_id = ?", (mode, chat_id), wait=True
+    )
+    invalidate_chat_settings(chat_id)
@@ -0,0 +1,373 @@
+# SPDX-License-Identifier: MIT
+# Copyright (c) 2025 Elinsrc
+
+from __future__ import annotations
+
+import asyncio
+import inspect
+import math
+import time
+from collections import deque
+from collections.abc import Hashable, Iterable
+from enum import IntEnum
+from operator import itemgetter
+
+import hydrogram
+from hydrogram import filters, raw, utils
+from hydrogram.dispatcher import Dispatcher
+from hydrogram.handlers import MessageHandler, RawUpdateHandler
+from hydrogram.handlers.handler import Handler
+from hydrogram.types import Message
+from loguru import logger
+
+from config import PREFIXES
+
+from .database.stats import Histogram, query_stats, render_histogram
+
+
+class Priority(IntEnum):
+    """Classes of updates, taken in this order by the workers."""
+
+    HIGH = 0  # callback queries and moderation commands
+    NORMAL = 1
+    LOW = 2  # commands downloading or rendering media
+
+
+MODERATION_COMMANDS = frozenset({
+    "ban", "tban", "unban", "kick", "mute", "tmute", "unmute", "warn", "resetwarns", "unwarn",
+    "pin", "unpin", "purge", "del", "report", "reportar",
+})  # fmt: skip
+HEAVY_COMMANDS = frozenset({
+    "ytdl", "yt", "music", "coub", "print", "kang", "kibe", "steal", "upload",
+})  # fmt: skip
+
+# The sudo commands use "!", whatever the prefixes are.
+COMMAND_PREFIXES = frozenset(PREFIXES) | {"!"}
+
+# At most this share of the workers run heavy commands at once, the others stay free for the rest.
+HEAVY_WORKERS_SHARE = 0.25
+
+# Upper bounds of the buckets of the time updates wait for a worker, in seconds.
+WAIT_BUCKETS = (0.001, 0.005, 0.01, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, math.inf)
+
+
+def command_priority(text: str) -> Priority:
+    if not text or text[0] not in COMMAND_PREFIXES:
+        return Priority.NORMAL
+
+    parts = text[1:].split(maxsplit=1)
+    if not parts:
+        return Priority.NORMAL
+
+    command = parts[0].split("@", 1)[0].lower()
+    if command in MODERATION_COMMANDS:
+        return Priority.HIGH
+    if command in HEAVY_COMMANDS:
+        return Priority.LOW
+    return Priority.NORMAL
+
+
+def classify(update: raw.base.Update) -> tuple[int | None, Priority]:
+    """The chat a raw update belongs to, if any, and its priority.
+
+    This runs before the update is parsed, so it only looks at the raw types.
+    """
+    if isinstance(update, raw.types.UpdateBotCallbackQuery):
+        return utils.get_peer_id(update.peer), Priority.HIGH
+    if isinstance(update, raw.types.UpdateInlineBotCallbackQuery):
+        return update.user_id, Priority.HIGH
+
+    message = getattr(update, "message", None)
+    if isinstance(message, raw.types.Message):
+        return utils.get_peer_id(message.peer_id), command_priority(message.message)
+    if isinstance(message, raw.types.MessageService):
+        return utils.get_peer_id(message.peer_id), Priority.NORMAL
+
+    if isinstance(update, raw.types.UpdateBotInlineQuery):
+        return update.user_id, Priority.NORMAL
+    if isinstance(update, raw.types.UpdateChatParticipant):
+        return -update.chat_id, Priority.NORMAL
+    if isinstance(update, raw.types.UpdateChannelParticipant):
+        return utils.get_channel_id(update.channel_id), Priority.NORMAL
+    if isinstance(update, raw.types.UpdateBotChatInviteRequester):
+        return utils.get_peer_id(update.peer), Priority.NORMAL
+    return None, Priority.NORMAL
+
+
+def required_command(flt: filters.Filter | None) -> filters.Filter | None:
+    """The command filter a message must pass for ``flt`` to, if any."""
+    if type(flt).__name__ == "CommandFilter":
+        return flt
+    if isinstance(flt, filters.AndFilter):
+        return required_command(flt.base) or required_command(flt.other)
+    return None
+
+
+class CommandIndex:
+    """The handlers of a group a new message may go through, by command.
+
+    A handler requiring a command only has to be checked for messages starting
+    with that command, so the handlers are indexed by the first word of their
+    commands. The other handlers, e.g. the regex ones, are checked for every
+    message. Either way the handler filters still decide, the index only skips
+    those that can't pass.
+    """
+
+    __slots__ = ("all", "by_command", "others", "prefixes")
+
+    def __init__(self, handlers: Iterable[Handler]):
+        commands: dict[str, dict[int, Handler]] = {}
+        others: dict[int, Handler] = {}
+        every: dict[int, Handler] = {}
+        prefixes: set[str] = set()
+        for position, handler in enumerate(handlers):
+            # The other handler types do nothing with new messages.
+            if not isinstance(handler, MessageHandler | RawUpdateHandler):
+                continue
+
+            every[position] = handler
+            command = None
+            if isinstance(handler, MessageHandler):
+                command = required_command(handler.filters)
+            if command is None:
+                others[position] = handler
+                continue
+
+            prefixes.update(command.prefixes)
+            for name in command.commands:
+                commands.setdefault(name.split(maxsplit=1)[0].lower(), {})[position] = handler
+
+        def ordered(entries: dict[int, Handler]) -> list[Handler]:
+            return [handler for _, handler in sorted(entries.items(), key=itemgetter(0))]
+
+        self.others = ordered(others)
+        self.all = ordered(every)
+        self.by_command = {name: ordered({**others, **entries}) for name, entries in commands.items()}
+        # The longest first, in case one is the start of another.
+        self.prefixes = sorted(prefixes, key=len, reverse=True)
+
+    def lookup(self, message: Message, username: str) -> list[Handler]:
+        text = message.text or message.caption
+        if not text:
+            return self.others
+
+        names = set()
+        for prefix in self.prefixes:
+            if text.startswith(prefix):
+                words = text[len(prefix) :].split(maxsplit=1)
+                if not words:
+                    continue
+
+                name = words[0].lower()
+                if "@" in name:
+                    names.add(name.split("@", 1)[0])
+                    continue
+
+                names.add(name)
+                # Command filters also take the bot username without the "@".
+                if username and name.endswith(username.lower()) and name != username.lower():
+                    names.add(name[: -len(username)])
+
+        if not names:
+            return self.others
+        if len(names) == 1:
+            return self.by_command.get(names.pop(), self.others)
+        return self.all
+
+
+class MikuDispatcher(Dispatcher):
+    """Hydrogram's dispatcher, handling the updates of a chat in order and the chats in parallel.
+
+    The updates are routed into a lane per chat. The workers take the ready lane
+    of highest priority, handle its oldest update and put it back if more
+    arrived meanwhile, so a chat is never handled by two workers at once. Heavy
+    commands have a lane of their own in each chat, not to hold up the rest of
+    it, and only a share of the workers may run them at a time.
+    """
+
+    def __init__(self, client):
+        super().__init__(client)
+        self.lanes: dict[Hashable, deque] = {}
+        self.ready: dict[Priority, deque[Hashable]] = {priority: deque() for priority in Priority}
+        self.wakeup = asyncio.Event()
+        self.closing = False
+        self.router_task: asyncio.Task | None = None
+        self.heavy_running = 0
+        self.heavy_limit = max(1, int(client.workers * HEAVY_WORKERS_SHARE))
+        self.queued = dict.fromkeys(Priority, 0)
+        self.command_index: list[CommandIndex] | None = None
+        self.reset_stats()
+
+    def reset_stats(self):
+        self.max_queued = dict(self.queued)
+        self.wait_times = {priority: Histogram(WAIT_BUCKETS) for priority in Priority}
+
+    async def start(self):
+        if not self.client.no_updates:
+            self.closing = False
+            self.router_task = self.loop.create_task(self.router())
+        await super().start()
+
+    async def stop(self):
+        if self.client.no_updates:
+            return
+
+        # The updates received so far are all handled before the workers stop.
+        self.updates_queue.put_nowait(None)
+        await self.router_task
+        self.closing = True
+        self.wakeup.set()
+        await asyncio.gather(*self.handler_worker_tasks)
+
+        self.handler_worker_tasks.clear()
+        self.groups.clear()
+        self.error_handlers.clear()
+        logger.info(f"Stopped {self.client.workers} handler workers.")
+
+    async def router(self):
+        while True:
+            packet = await self.updates_queue.get()
+            if packet is None:
+                break
+            self.schedule(packet)
+
+    def schedule(self, packet):
+        chat_id, priority = classify(packet[0])
+        if chat_id is None:
+            key = object()  # nothing to keep in order with
+        elif priority is Priority.LOW:
+            key = (chat_id, priority)
+        else:
+            key = chat_id
+
+        self.queued[priority] += 1
+        self.max_queued[priority] = max(self.max_queued[priority], self.queued[priority])
+
+        lane = self.lanes.get(key)
+        if lane is None:
+            # Otherwise the lane is either ready or being handled, and gets back to its new update.
+            lane = self.lanes[key] = deque()
+            self.ready[priority].append(key)
+            self.wakeup.set()
+        lane.append((packet, priority, time.monotonic()))
+
+    async def next_lane(self) -> Hashable | None:
+        """The key of the lane to handle next, or None once the dispatcher is stopped."""
+        while True:
+            for priority, keys in self.ready.items():
+                if keys and (priority is not Priority.LOW or self.heavy_running < self.heavy_limit):
+                    return keys.popleft()
+
+            if self.closing and not self.lanes:
+                return None
+
+            self.wakeup.clear()
+            await self.wakeup.wait()
+
+    async def handler_worker(self, lock):
+        while True:
+            key = await self.next_lane()
+            if key is None:
+                break
+
+            lane = self.lanes[key]
+            packet, priority, queued_at = lane.popleft()
+            self.queued[priority] -= 1
+            self.wait_times[priority].observe(time.monotonic() - queued_at)
+
+            if priority is Priority.LOW:
+                self.heavy_running += 1
+            try:
+                await self._process_packet(packet, lock)
+            finally:
+                if priority is Priority.LOW:
+                    self.heavy_running -= 1
+
+                if lane:
+                    self.ready[lane[0][1]].append(key)
+                else:
+                    del self.lanes[key]
+                self.wakeup.set()
+
+    def add_handler(self, handler, group: int):
+        # Unlike hydrogram, the handler is added right away, not from a task
+        # racing with the updates, so the command index can be rebuilt.
+        if isinstance(handler, hydrogram.handlers.ErrorHandler):
+            if handler not in self.error_handlers:
+                self.error_handlers.append(handler)
+            return
+
+        if group not in self.groups:
+            self.groups[group] = []
+            self.groups = dict(sorted(self.groups.items()))
+        self.groups[group].append(handler)
+        self.command_index = None
+
+    def remove_handler(self, handler, group: int):
+        if isinstance(handler, hydrogram.handlers.ErrorHandler):
+            if handler not in self.error_handlers:
+                raise ValueError(f"Error handler {handler} does not exist. Handler was not removed.")
+            self.error_handlers.remove(handler)
+            return
+
+        if group not in self.groups:
+            raise ValueError(f"Group {group} does not exist. Handler was not removed.")
+        self.groups[group].remove(handler)
+        self.command_index = None
+
+    def handlers_for(self, update, handler_type) -> Iterable[list[Handler]]:
+        """The handlers of each group that may handle an update, in order."""
+        if handler_type is not MessageHandler:
+            return self.groups.values()
+
+        if self.command_index is None:
+            self.command_index = [CommandIndex(handlers) for handlers in self.groups.values()]
+
+        username = self.client.me.username or ""
+        return [index.lookup(update, username) for index in self.command_index]
+
+    async def _process_packet(self, packet, lock):
+        # Every handler an update goes through runs in here.
+        with query_stats.track_update():
+            try:
+                update, users, chats = packet
+                parser = self.update_parsers.get(type(update))
+                if not parser:
+                    return
+
+                if inspect.iscoroutinefunction(parser):
+                    parsed_update, handler_type = await parser(update, users, chats)
+                else:
+                    parsed_update, handler_type = parser(update, users, chats)
+
+                async with lock:
+                    for handlers in self.handlers_for(parsed_update, handler_type):
+                        for handler in handlers:
+                            await self._handle_update(
+                                handler, handler_type, parsed_update, update, users, chats
+                            )
+            except hydrogram.StopPropagation:
+                pass
+            except Exception:
+                logger.exception("Unable to handle an update.")
+            finally:
+                self.updates_queue.task_done()
+
+    def render_metrics(self) -> str:
+        """Export the scheduling stats in the Prometheus text format."""
+        lines = [
+            "# HELP miku_updates_queued Updates waiting for a worker, by priority.",
+            "# TYPE miku_updates_queued gauge",
+        ]
+        lines.extend(
+            f'miku_updates_queued{{priority="{priority.name.lower()}"}} {count}'
+            for priority, count in self.queued.items()
+        )
+        render_histogram(
+            lines,
+            "miku_update_wait_seconds",
+            "Time the updates waited for a worker, by priority.",
+            {priority.name.lower(): hist for priority, hist in self.wait_times.items()},
+            "priority",
+        )
+        return "\n".join(lines) + "\n"
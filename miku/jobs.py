@@ -0,0 +1,238 @@
+# SPDX-License-Identifier: MIT
+# Copyright (c) 2025 Elinsrc
+
+"""Background jobs, for the commands downloading, rendering or uploading media.
+
+A plugin registers a handler for a kind of job with :func:`job_handler` and
+queues jobs with :func:`enqueue`. The jobs are stored in the database, and run
+by a few workers of their own, so they neither hold up the update workers nor
+get lost when the bot restarts. A job that raises is tried again later, a few
+times, unless it raises :class:`PermanentJobError`.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import contextlib
+import json
+from collections.abc import Awaitable, Callable
+from dataclasses import dataclass, field
+from typing import TYPE_CHECKING, Any
+
+from hydrogram.errors import BadRequest, FloodWait, RPCError
+from loguru import logger
+
+from .database.jobs import (
+    add_job,
+    claim_job,
+    fail_job,
+    finish_job,
+    get_due_jobs,
+    release_job,
+    renew_job,
+    retry_job,
+    set_job_progress,
+)
+from .outbound import bulk_sends
+from .utils.localization import get_lang, get_strings
+
+if TYPE_CHECKING:
+    from hydrogram import Client
+    from hydrogram.types import Message
+
+# How many jobs run at once.
+JOB_WORKERS = 3
+
+# A job failing this many times is given up.
+JOB_MAX_ATTEMPTS = 4
+
+# Seconds before trying a failed job again, doubled at each attempt.
+JOB_RETRY_DELAY = 30
+
+# A running job is considered abandoned, and run again, if its lease isn't
+# renewed for this many seconds. The worker renews it every third of that.
+JOB_LEASE = 60
+
+# How often the database is checked for due jobs, in seconds, besides when one
+# is queued or finished.
+JOB_POLL_INTERVAL = 5
+
+JobHandler = Callable[["Client", "Job"], Awaitable[None]]
+
+job_handlers: dict[str, JobHandler] = {}
+
+
+class PermanentJobError(Exception):
+    """Raised by a job handler when trying again won't help."""
+
+
+def job_handler(kind: str) -> Callable[[JobHandler], JobHandler]:
+    def decorator(func: JobHandler) -> JobHandler:
+        job_handlers[kind] = func
+        return func
+
+    return decorator
+
+
+async def enqueue(kind: str, payload: dict[str, Any], status: Message | None = None) -> int:
+    """Queue a job and return its ID.
+
+    ``status`` is a message of the bot the job can report its progress in,
+    see :meth:`Job.edit_status`.
+    """
+    if status is not None:
+        payload = {**payload, "status": [status.chat.id, status.id]}
+
+    job_id = await add_job(kind, json.dumps(payload))
+    job_runner.wakeup.set()
+    return job_id
+
+
+@dataclass
+class Job:
+    id: int
+    kind: str
+    payload: dict[str, Any]
+    attempts: int
+    client: Client
+    # Whatever the handler saved with set_progress, it's kept across restarts.
+    progress: dict[str, Any] = field(default_factory=dict)
+
+    @property
+    def last_attempt(self) -> bool:
+        return self.attempts >= JOB_MAX_ATTEMPTS
+
+    async def set_progress(self, **values: Any):
+        self.progress.update(values)
+        await set_job_progress(self.id, json.dumps(self.progress))
+
+    async def edit_status(self, text: str, **kwargs: Any):
+        """Edit the status message of the job, if it has one."""
+        if "status" not in self.payload:
+            return
+
+        chat_id, message_id = self.payload["status"]
+        with contextlib.suppress(BadRequest):
+            await self.client.edit_message_text(chat_id, message_id, text, **kwargs)
+
+    async def delete_status(self):
+        if "status" not in self.payload:
+            return
+
+        chat_id, message_id = self.payload["status"]
+        with contextlib.suppress(BadRequest):
+            await self.client.delete_messages(chat_id, message_id)
+
+
+class JobRunner:
+    def __init__(self):
+        self.client: Client | None = None
+        self.wakeup = asyncio.Event()
+        self.running: dict[int, Job] = {}
+        self.tasks: dict[int, asyncio.Task] = {}
+        self.poll_task: asyncio.Task | None = None
+
+    def start(self, client: Client):
+        self.client = client
+        self.poll_task = asyncio.create_task(self.poll_loop())
+
+    async def stop(self):
+        """Stop the workers, the jobs they were running are queued again."""
+        if self.poll_task is None:
+            return
+
+        self.poll_task.cancel()
+        tasks = list(self.tasks.values())
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(self.poll_task, *tasks, return_exceptions=True)
+        self.poll_task = None
+
+    async def poll_loop(self):
+        while True:
+            self.wakeup.clear()
+            try:
+                await self.start_due_jobs()
+            except Exception:
+                logger.exception("Unable to start the due jobs.")
+
+            with contextlib.suppress(TimeoutError):
+                await asyncio.wait_for(self.wakeup.wait(), JOB_POLL_INTERVAL)
+
+    async def start_due_jobs(self):
+        free = JOB_WORKERS - len(self.running)
+        if free <= 0:
+            return
+
+        for job_id, kind, payload, attempts, progress in await get_due_jobs(free):
+            if job_id in self.running or not await claim_job(job_id, JOB_LEASE):
+                continue
+
+            job = Job(
+                id=job_id,
+                kind=kind,
+                payload=json.loads(payload),
+                attempts=attempts + 1,
+                client=self.client,
+                progress=json.loads(progress) if progress else {},
+            )
+            self.running[job_id] = job
+            self.tasks[job_id] = asyncio.create_task(self.run(job))
+
+    async def run(self, job: Job):
+        heartbeat = asyncio.create_task(self.heartbeat(job))
+        try:
+            handler = job_handlers.get(job.kind)
+            if handler is None:
+                raise PermanentJobError(f"No handler for the '{job.kind}' jobs.")
+            # The uploads of the jobs wait behind the answers to the commands.
+            with bulk_sends():
+                await handler(self.client, job)
+        except asyncio.CancelledError:
+            await release_job(job.id)
+            raise
+        except Exception as e:
+            error = f"{e.__class__.__name__}: {e}"
+            if isinstance(e, PermanentJobError):
+                logger.error(f"The {job.kind} job {job.id} failed: {error}")
+                await self.give_up(job, error)
+            elif job.last_attempt:
+                logger.opt(exception=e).error(f"The {job.kind} job {job.id} failed.")
+                await self.give_up(job, error)
+            else:
+                if isinstance(e, FloodWait):
+                    delay = e.value
+                else:
+                    delay = JOB_RETRY_DELAY * 2 ** (job.attempts - 1)
+                logger.warning(f"The {job.kind} job {job.id} failed ({error}), retrying in {delay}s.")
+                await retry_job(job.id, delay, error)
+        else:
+            await finish_job(job.id)
+        finally:
+            heartbeat.cancel()
+            self.running.pop(job.id, None)
+            self.tasks.pop(job.id, None)
+            self.wakeup.set()
+
+    async def give_up(self, job: Job, error: str):
+        await fail_job(job.id, error)
+
+        # Otherwise the status would show the last progress of the job forever.
+        if "status" in job.payload:
+            s = get_strings(await get_lang(job.payload["status"][0], self.client))
+            try:
+                await job.edit_status(s("job_failed"))
+            except RPCError as e:
+                logger.warning(f"Unable to show that the {job.kind} job {job.id} failed: {e}")
+
+    @staticmethod
+    async def heartbeat(job: Job):
+        while True:
+            await asyncio.sleep(JOB_LEASE / 3)
+            try:
+                await renew_job(job.id, JOB_LEASE)
+            except Exception:
+                logger.exception(f"Unable to renew the lease of the {job.kind} job {job.id}.")
+
+
+job_runner = JobRunner()
@@ -0,0 +1,218 @@
+# SPDX-License-Identifier: MIT
+# Copyright (c) 2025 Elinsrc
+
+"""Rate limiting of the messages the bot sends.
+
+Telegram allows bots about a message per second in a chat, 20 per minute in
+a group and 30 per second overall, and answers the calls going over with a
+FloodWait. The calls sending, editing or deleting messages wait here for a
+token of their chat and a global one instead, see :meth:`Outbound.invoke`. A
+FloodWait only postpones the later calls of its chat, the others go on. The
+deletions outside of channels don't tell their chat, they only wait for a
+global token.
+
+Calls made within :func:`bulk_sends`, like those of the jobs, wait behind the
+others, so the answers to the commands aren't held up by a batch of uploads.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import contextlib
+import heapq
+import itertools
+import time
+from collections.abc import Awaitable, Callable, Hashable, Iterator
+from contextvars import ContextVar
+from typing import Any
+
+from hydrogram import raw, utils
+from hydrogram.errors import FloodWait
+from loguru import logger
+
+# Tokens per second and how many may be used at once, by kind of chat.
+PRIVATE_RATE, PRIVATE_BURST = 1.0, 3
+GROUP_RATE, GROUP_BURST = 20 / 60, 10
+GLOBAL_RATE, GLOBAL_BURST = 30.0, 30
+
+# The buckets of the chats without a call for this many seconds are dropped.
+IDLE_BUCKET_TTL = 10 * 60
+
+URGENT, BULK = 0, 1
+
+# The attribute of the functions limited holding the chat they act in, None if they have none.
+LIMITED_FUNCTIONS = {
+    raw.functions.messages.SendMessage: "peer",
+    raw.functions.messages.SendMedia: "peer",
+    raw.functions.messages.SendMultiMedia: "peer",
+    raw.functions.messages.ForwardMessages: "to_peer",
+    raw.functions.messages.EditMessage: "peer",
+    raw.functions.messages.DeleteMessages: None,
+    raw.functions.channels.DeleteMessages: "channel",
+}
+
+send_priority: ContextVar[int] = ContextVar("send_priority", default=URGENT)
+
+
+@contextlib.contextmanager
+def bulk_sends() -> Iterator[None]:
+    """Make the calls made within wait behind the others."""
+    token = send_priority.set(BULK)
+    try:
+        yield
+    finally:
+        send_priority.reset(token)
+
+
+def query_chat(query: Any) -> int | None:
+    """The ID of the chat a limited function acts in, None if it doesn't tell."""
+    attr = LIMITED_FUNCTIONS.get(type(query))
+    if attr is None:
+        return None
+
+    peer = getattr(query, attr)
+    if isinstance(peer, raw.types.InputPeerUser):
+        return peer.user_id
+    if isinstance(peer, raw.types.InputPeerChat):
+        return -peer.chat_id
+    if isinstance(peer, raw.types.InputPeerChannel | raw.types.InputChannel):
+        return utils.get_channel_id(peer.channel_id)
+    return None
+
+
+class TokenBucket:
+    """Hands out ``rate`` tokens per second, up to ``burst`` at once, by priority."""
+
+    def __init__(self, rate: float, burst: int):
+        self.rate = rate
+        self.burst = burst
+        self.tokens = float(burst)
+        self.updated = time.monotonic()
+        # Set by a FloodWait, nothing goes out before.
+        self.blocked_until = 0.0
+        self.waiters: list[tuple[int, int, asyncio.Future]] = []
+        self.counter = itertools.count()
+        self.drain_task: asyncio.Task | None = None
+
+    def refill(self, now: float):
+        # Nothing is credited during a block, updated is then its end.
+        if now <= self.updated:
+            return
+        self.tokens = min(self.burst, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def delay(self, now: float) -> float:
+        """Seconds before a token is available."""
+        self.refill(now)
+        if now < self.blocked_until:
+            return self.blocked_until - now
+        if self.tokens < 1:
+            return (1 - self.tokens) / self.rate
+        return 0.0
+
+    def block(self, seconds: float):
+        self.blocked_until = max(self.blocked_until, time.monotonic() + seconds)
+        # A single call may go out once it ends, the next ones wait for the rate.
+        self.tokens = 1.0
+        self.updated = self.blocked_until
+
+    async def acquire(self, priority: int) -> float:
+        """Take a token, return how long it was waited for."""
+        if not self.waiters and self.delay(time.monotonic()) == 0:
+            self.tokens -= 1
+            return 0.0
+
+        started = time.monotonic()
+        future = asyncio.get_running_loop().create_future()
+        heapq.heappush(self.waiters, (priority, next(self.counter), future))
+        if self.drain_task is None or self.drain_task.done():
+            self.drain_task = asyncio.create_task(self.drain())
+        await future
+        return time.monotonic() - started
+
+    async def drain(self):
+        # The waiters are taken in order of priority when a token is available,
+        # so an urgent call queued meanwhile gets ahead of the bulk ones.
+        while self.waiters:
+            delay = self.delay(time.monotonic())
+            if delay > 0:
+                await asyncio.sleep(delay)
+                continue
+
+            _, _, future = heapq.heappop(self.waiters)
+            if not future.done():
+                self.tokens -= 1
+                future.set_result(None)
+
+    @property
+    def idle(self) -> bool:
+        return not self.waiters and self.delay(time.monotonic()) == 0 and self.tokens >= self.burst
+
+
+class Outbound:
+    def __init__(self):
+        self.global_bucket = TokenBucket(GLOBAL_RATE, GLOBAL_BURST)
+        self.buckets: dict[Hashable, TokenBucket] = {}
+        self.last_prune = time.monotonic()
+        self.delayed = 0
+        self.flood_waits = 0
+
+    def reset_stats(self):
+        self.delayed = 0
+        self.flood_waits = 0
+
+    def bucket(self, chat_id: int) -> TokenBucket:
+        bucket = self.buckets.get(chat_id)
+        if bucket is None:
+            if chat_id > 0:
+                bucket = TokenBucket(PRIVATE_RATE, PRIVATE_BURST)
+            else:
+                bucket = TokenBucket(GROUP_RATE, GROUP_BURST)
+            self.buckets[chat_id] = bucket
+        return bucket
+
+    def prune(self):
+        now = time.monotonic()
+        if now - self.last_prune < IDLE_BUCKET_TTL:
+            return
+
+        self.last_prune = now
+        for chat_id, bucket in list(self.buckets.items()):
+            if bucket.idle:
+                del self.buckets[chat_id]
+
+    async def invoke(
+        self, send: Callable[[float], Awaitable[Any]], query: Any, sleep_threshold: float
+    ) -> Any:
+        """Call ``send`` once the chat of ``query`` and the global limit allow it.
+
+        ``send`` is given the sleep threshold for the session: zero, so that a
+        FloodWait reaches here and postpones the chat. The call is then made
+        again if the wait is within ``sleep_threshold``.
+        """
+        if type(query) not in LIMITED_FUNCTIONS:
+            return await send(sleep_threshold)
+
+        self.prune()
+        chat_id = query_chat(query)
+        bucket = None if chat_id is None else self.bucket(chat_id)
+        priority = send_priority.get()
+        while True:
+            waited = 0.0 if bucket is None else await bucket.acquire(priority)
+            waited += await self.global_bucket.acquire(priority)
+            if waited:
+                self.delayed += 1
+
+            try:
+                return await send(0)
+            except FloodWait as e:
+                self.flood_waits += 1
+                if bucket is not None:
+                    bucket.block(e.value)
+                if e.value > sleep_threshold:
+                    raise
+                where = "" if chat_id is None else f" in {chat_id}"
+                logger.warning(f"Waiting {e.value}s to send{where}, for {type(query).__name__}.")
+                if bucket is None:
+                    # Its chat isn't known, so only this call waits.
+                    await asyncio.sleep(e.value)
@@ -6,7 +6,7 @@ from hydrogram.types import ChatPrivileges, Message
 
 from config import PREFIXES
 from miku.utils import commands, extract_time, get_reason_text, get_target_user
-from miku.utils.consts import ADMIN_STATUSES
+from miku.utils.admins import get_admin
 from miku.utils.decorators import require_admin
 from miku.utils.localization import Strings, use_chat_lang
 
@@ -17,8 +17,7 @@ from miku.utils.localization import Strings, use_chat_lang
 async def ban(c: Client, m: Message, s: Strings):
     target_user = await get_target_user(c, m)
     reason = get_reason_text(c, m)
-    check_admin = await m.chat.get_member(target_user.id)
-    if check_admin.status in ADMIN_STATUSES:
+    if await get_admin(m.chat, target_user.id):
         await m.reply_text(s("ban_cannot_ban_admins"))
         return
 
@@ -39,8 +38,7 @@ async def ban(c: Client, m: Message, s: Strings):
 async def kick(c: Client, m: Message, s: Strings):
     target_user = await get_target_user(c, m)
     reason = get_reason_text(c, m)
-    check_admin = await m.chat.get_member(target_user.id)
-    if check_admin.status in ADMIN_STATUSES:
+    if await get_admin(m.chat, target_user.id):
         await m.reply_text(s("kick_cannot_kick_admins"))
         return
 
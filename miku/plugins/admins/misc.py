@@ -4,11 +4,15 @@
 import asyncio
 
 from hydrogram import Client, filters
+from hydrogram.errors import ChatAdminRequired, Forbidden
 from hydrogram.types import ChatPrivileges, Message
 
 from config import PREFIXES
 from miku.database.admins import check_if_del_service, toggle_del_service
+from miku.outbound import bulk_sends
 from miku.utils import commands
+from miku.utils.admins import forget_bot_privileges, get_bot_privileges
+from miku.utils.context import get_context
 from miku.utils.decorators import require_admin
 from miku.utils.localization import Strings, use_chat_lang
 
@@ -23,15 +27,16 @@ async def purge(c: Client, m: Message, s: Strings):
     message_ids = []
     count_del_etion_s = 0
     if m.reply_to_message:
-        for a_s_message_id in range(m.reply_to_message.id, m.id):
-            message_ids.append(a_s_message_id)
-            if len(message_ids) == 100:
+        with bulk_sends():
+            for a_s_message_id in range(m.reply_to_message.id, m.id):
+                message_ids.append(a_s_message_id)
+                if len(message_ids) == 100:
+                    await c.delete_messages(chat_id=m.chat.id, message_ids=message_ids)
+                    count_del_etion_s += len(message_ids)
+                    message_ids = []
+            if len(message_ids) > 0:
                 await c.delete_messages(chat_id=m.chat.id, message_ids=message_ids)
                 count_del_etion_s += len(message_ids)
-                message_ids = []
-        if len(message_ids) > 0:
-            await c.delete_messages(chat_id=m.chat.id, message_ids=message_ids)
-            count_del_etion_s += len(message_ids)
     await status_message.edit_text(s("purge_success").format(count=count_del_etion_s))
     await asyncio.sleep(5)
     await status_message.delete()
@@ -60,14 +65,17 @@ async def delservice(c: Client, m: Message, s: Strings):
 
 @Client.on_message(filters.service, group=-1)
 async def delservice_action(c: Client, m: Message):
-    get_delservice = await check_if_del_service(m.chat.id)
-    if not get_delservice:
+    context = get_context(m)
+    if not (await context.chat()).delservicemsgs:
         return
 
-    self_member = await m.chat.get_member("me")
-
-    if self_member.privileges and self_member.privileges.can_delete_messages:
-        await m.delete()
+    privileges = await get_bot_privileges(m.chat)
+    if privileges and privileges.can_delete_messages:
+        try:
+            await m.delete()
+        except (ChatAdminRequired, Forbidden):
+            # The privileges changed without the bot hearing about it.
+            forget_bot_privileges(m.chat.id)
 
 
 commands.add_command("cleanservice", "admin")
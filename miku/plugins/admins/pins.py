@@ -2,11 +2,14 @@
 # Copyright (c) 2018-2024 Amano LLC
 
 from hydrogram import Client, filters
+from hydrogram.errors import ChatAdminRequired, Forbidden
 from hydrogram.types import ChatPrivileges, Message
 
 from config import PREFIXES
 from miku.database.admins import check_if_antichannelpin, toggle_antichannelpin
 from miku.utils import commands
+from miku.utils.admins import forget_bot_privileges, get_bot_privileges
+from miku.utils.context import get_context
 from miku.utils.decorators import require_admin
 from miku.utils.localization import Strings, use_chat_lang
 
@@ -35,10 +38,17 @@ async def setantichannelpin(c: Client, m: Message, s: Strings):
 
 @Client.on_message(filters.linked_channel, group=-1)
 async def acp_action(c: Client, m: Message):
-    get_acp = await check_if_antichannelpin(m.chat.id)
-    getmychatmember = await m.chat.get_member("me")
-    if (get_acp and getmychatmember.can_pin_messages) is True:
-        await m.unpin()
+    context = get_context(m)
+    get_acp = (await context.chat()).antichannelpin
+    if not get_acp:
+        return
+    privileges = await get_bot_privileges(m.chat)
+    if privileges and privileges.can_pin_messages:
+        try:
+            await m.unpin()
+        except (ChatAdminRequired, Forbidden):
+            # The privileges changed without the bot hearing about it.
+            forget_bot_privileges(m.chat.id)
 
 
 @Client.on_message(filters.command("pin", PREFIXES))
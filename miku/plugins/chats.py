@@ -2,32 +2,50 @@
 # Copyright (c) 2018-2024 Amano LLC
 
 from hydrogram import Client
-from hydrogram.types import Message
+from hydrogram.types import ChatMemberUpdated, Message
 
-from miku.database.chats import add_chat, chat_exists
-from miku.database.antispam import get_antispam
-from miku.utils.localization import Strings, use_chat_lang
+from miku.database.chats import add_chat, is_known_chat
+from miku.outbound import bulk_sends
 from miku.utils import check_spam_user
+from miku.utils.admins import invalidate_admins, set_bot_privileges
+from miku.utils.consts import ADMIN_STATUSES, GROUP_TYPES
+from miku.utils.context import get_context
 
 # This is the first plugin run to guarantee
 # that the actual chat is initialized in the DB.
 
 
 @Client.on_message(group=-1)
-@use_chat_lang
-async def check_chat(c: Client, m: Message, s: Strings):
+async def check_chat(c: Client, m: Message):
     if not m.from_user:
         return
 
-    chatexists = await chat_exists(m.chat.id, m.chat.type)
-
-    if not chatexists:
+    if not is_known_chat(m.chat.id):
         await add_chat(m.chat.id, m.chat.type)
 
-    antispam = await get_antispam(m.chat.id)
-    if antispam:
+    # Antispam is a group setting, cached with the others.
+    if m.chat.type not in GROUP_TYPES:
+        return
+
+    context = get_context(m)
+    if (await context.chat()).antispam:
         spam_user = await check_spam_user(m.from_user.id)
         if spam_user:
             await c.ban_chat_member(m.chat.id, m.from_user.id)
             await c.delete_user_history(m.chat.id, m.from_user.id)
-            await c.send_message(m.chat.id, s("antispam_ban_msg").format(user=m.from_user.mention))
+            s = await context.strings()
+            with bulk_sends():
+                await c.send_message(
+                    m.chat.id, s("antispam_ban_msg").format(user=m.from_user.mention)
+                )
+
+
+@Client.on_chat_member_updated(group=-1)
+async def check_admins(c: Client, u: ChatMemberUpdated):
+    # Someone became or stopped being an admin, or an admin's privileges changed.
+    members = (u.old_chat_member, u.new_chat_member)
+    if any(member and member.status in ADMIN_STATUSES for member in members):
+        await invalidate_admins(u.chat.id)
+
+    if u.new_chat_member and u.new_chat_member.user.id == c.me.id:
+        set_bot_privileges(u.chat.id, u.new_chat_member)
@@ -12,6 +12,7 @@ from hydrogram.types import (
 )
 
 from miku.utils import commands
+from miku.utils.callbacks import callback_data, on_callback
 from miku.utils.decorators import stop_here
 from miku.utils.localization import Strings, use_chat_lang
 
@@ -21,7 +22,7 @@ def gen_categories_kb(strings_manager):
         [
             InlineKeyboardButton(
                 strings_manager(f"cmds_category_{category}"),
-                callback_data=f"view_category {category}",
+                callback_data=callback_data("view_category", category),
             )
             for category in categories
             if category
@@ -30,7 +31,7 @@ def gen_categories_kb(strings_manager):
     ]
 
 
-@Client.on_callback_query(filters.regex("^commands$"))
+@on_callback("commands")
 @use_chat_lang
 async def cmds_list(c: Client, m: CallbackQuery, s: Strings):
     keyboard = InlineKeyboardMarkup(
@@ -77,10 +78,10 @@ async def show_help(c: Client, m: Message, s: Strings):
     await m.reply_text(s("cmds_list_group_help"), reply_markup=keyboard)
 
 
-@Client.on_callback_query(filters.regex("^view_category .+"))
+@on_callback("view_category", str)
 @use_chat_lang
-async def get_category(c: Client, m: CallbackQuery, s: Strings):
-    msg = commands.get_commands_message(s, m.data.split(maxsplit=1)[1])
+async def get_category(c: Client, m: CallbackQuery, category: str, s: Strings):
+    msg = commands.get_commands_message(s, category)
     keyboard = InlineKeyboardMarkup(
         inline_keyboard=[[InlineKeyboardButton(s("general_back_btn"), callback_data="commands")]]
     )
@@ -9,6 +9,7 @@ from hydrogram.types import ChatPrivileges, InlineKeyboardMarkup, Message, ChatM
 
 from config import PREFIXES
 from miku.database.welcome import get_welcome, set_welcome, toggle_welcome
+from miku.outbound import bulk_sends
 from miku.utils import button_parser, commands, get_format_keys, check_spam_user
 from miku.utils.decorators import require_admin, stop_here
 from miku.utils.localization import Strings, use_chat_lang
@@ -153,10 +154,12 @@ async def greet_new_members(c: Client, m: ChatMemberUpdated, s: Strings):
         if spam_user:
             await c.ban_chat_member(m.chat.id, user.id)
 
-            await c.send_message(
-                m.chat.id,
-                s("antispam_ban_msg").format(user=user.mention),
-            )
+            # Joins come in waves, their notices wait behind the answers to the commands.
+            with bulk_sends():
+                await c.send_message(
+                    m.chat.id,
+                    s("antispam_ban_msg").format(user=user.mention),
+                )
             return
 
     welcome, welcome_enabled = await get_welcome(m.chat.id)
@@ -194,14 +197,15 @@ async def greet_new_members(c: Client, m: ChatMemberUpdated, s: Strings):
 
     welcome, welcome_buttons = button_parser(welcome)
 
-    await c.send_message(
-        chat_id=m.chat.id,
-        text=welcome,
-        disable_web_page_preview=True,
-        reply_markup=(
-            InlineKeyboardMarkup(welcome_buttons) if welcome_buttons else None
-        ),
-    )
+    with bulk_sends():
+        await c.send_message(
+            chat_id=m.chat.id,
+            text=welcome,
+            disable_web_page_preview=True,
+            reply_markup=(
+                InlineKeyboardMarkup(welcome_buttons) if welcome_buttons else None
+            ),
+        )
 
 
 commands.add_command("resetwelcome", "admin")
@@ -18,6 +18,7 @@ from yarl import URL
 
 from config import PREFIXES
 from miku.utils import commands, http, inline_commands
+from miku.utils.callbacks import callback_data, on_callback
 from miku.utils.localization import Strings, use_chat_lang
 
 
@@ -107,7 +108,7 @@ async def ip_cmd(c: Client, m: Message, s: Strings):
             [
                 InlineKeyboardButton(
                     ip,
-                    callback_data=f"ip {ip}",
+                    callback_data=callback_data("ip", ip),
                 )
             ]
             for ip in ips
@@ -115,11 +116,9 @@ async def ip_cmd(c: Client, m: Message, s: Strings):
     )
 
 
-@Client.on_callback_query(filters.regex(r"^ip .+"))
+@on_callback("ip", str)
 @use_chat_lang
-async def ip_callback(c: Client, cb: CallbackQuery, s: Strings):
-    ip = cb.data.split(maxsplit=1)[1]
-
+async def ip_callback(c: Client, cb: CallbackQuery, ip: str, s: Strings):
     await cb.edit_message_text(format_api_return(await get_api_return(ip), s))
 
 
@@ -175,7 +174,7 @@ async def ip_inline(c: Client, q: InlineQuery, s: Strings):
                     [
                         InlineKeyboardButton(
                             ip,
-                            callback_data=f"ip {ip}",
+                            callback_data=callback_data("ip", ip),
                         )
                     ]
                     for ip in ips
@@ -16,6 +16,7 @@ from hydrogram.types import (
 
 from config import PREFIXES
 from miku.database.localization import set_db_lang
+from miku.utils.callbacks import callback_data, on_callback
 from miku.utils.decorators import require_admin
 from miku.utils.localization import Strings, langdict, use_chat_lang
 
@@ -25,7 +26,7 @@ def gen_langs_kb():
         [
             InlineKeyboardButton(
                 f"{langdict[lang]['_meta_language_flag']} {langdict[lang]['_meta_language_name']}",
-                callback_data=f"set_lang {lang}",
+                callback_data=callback_data("set_lang", lang),
             )
             for lang in langs
             if lang
@@ -34,7 +35,7 @@ def gen_langs_kb():
     ]
 
 
-@Client.on_callback_query(filters.regex("^chlang$"))
+@on_callback("chlang")
 @Client.on_message(filters.command(["setchatlang", "setlang"], PREFIXES) & filters.group)
 @require_admin(allow_in_private=True)
 @use_chat_lang
@@ -62,10 +63,9 @@ async def chlang(c: Client, m: CallbackQuery | Message, s: Strings):
     await sender(res, reply_markup=markup)
 
 
-@Client.on_callback_query(filters.regex("^set_lang "))
+@on_callback("set_lang", str)
 @require_admin(allow_in_private=True)
-async def set_chat_lang(c: Client, m: CallbackQuery):
-    lang = m.data.split()[1]
+async def set_chat_lang(c: Client, m: CallbackQuery, lang: str):
     await set_db_lang(m.message.chat.id, m.message.chat.type, lang)
 
     await set_chat_lang_edit(c, m)
@@ -6,13 +6,13 @@ from html import escape
 from urllib.parse import quote, unquote
 
 from hydrogram import Client, filters
-from hydrogram.enums import ChatMembersFilter, ParseMode
+from hydrogram.enums import ParseMode
 from hydrogram.errors import BadRequest
 from hydrogram.types import InlineKeyboardMarkup, Message
 
 from config import LOG_CHAT, PREFIXES
 from miku.utils import button_parser, commands, http
-from miku.utils.consts import ADMIN_STATUSES
+from miku.utils.admins import get_admins
 from miku.utils.localization import Strings, use_chat_lang
 
 
@@ -52,8 +52,8 @@ async def html(c: Client, m: Message, s: Strings):
 @use_chat_lang
 async def mentionadmins(c: Client, m: Message, s: Strings):
     mention = ""
-    async for i in m.chat.get_members(m.chat.id, filter=ChatMembersFilter.ADMINISTRATORS):
-        if not (i.user.is_deleted or i.privileges.is_anonymous):
+    for i in (await get_admins(m.chat)).values():
+        if not (i.user.is_deleted or (i.privileges and i.privileges.is_anonymous)):
             mention += f"{i.user.mention}\n"
     await c.send_message(
         m.chat.id,
@@ -71,13 +71,13 @@ async def reportadmins(c: Client, m: Message, s: Strings):
     if not m.reply_to_message.from_user:
         return
 
-    check_admin = await m.chat.get_member(m.reply_to_message.from_user.id)
-    if check_admin.status in ADMIN_STATUSES:
+    admins = await get_admins(m.chat)
+    if m.reply_to_message.from_user.id in admins:
         return
 
     mention = ""
-    async for i in m.chat.get_members(filter=ChatMembersFilter.ADMINISTRATORS):
-        if not (i.user.is_deleted or i.privileges.is_anonymous or i.user.is_bot):
+    for i in admins.values():
+        if not (i.user.is_deleted or (i.privileges and i.privileges.is_anonymous) or i.user.is_bot):
             mention += f"<a href='tg://user?id={i.user.id}'>\u2063</a>"
     await m.reply_to_message.reply_text(
         s("report_admins").format(
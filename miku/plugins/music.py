@@ -2,6 +2,8 @@
 # Copyright (c) 2025 Elinsrc
 
 import io
+from dataclasses import asdict, dataclass
+
 from loguru import logger
 from mutagen import File
 
@@ -14,40 +16,43 @@ from hydrogram.types import (
 )
 
 from config import PREFIXES
+from miku.jobs import Job, enqueue, job_handler
 from miku.utils import commands
-from miku.utils.musiclib import Music
-from miku.utils.localization import Strings, use_chat_lang
+from miku.utils.callbacks import CallbackState, callback_data, on_callback, store_state
+from miku.utils.musiclib import Music, Track
+from miku.utils.localization import Strings, get_lang, get_strings, use_chat_lang
+from miku.utils.progress import ProgressReporter
 
 
-class MusicService:
-    def __init__(self):
-        self.tracks_map = {}
+PAGE_SIZE = 10
 
-    def get_tracks(self, user_id: int, mid: int):
-        return self.tracks_map.get((user_id, mid), [])
 
-    def set_tracks(self, user_id: int, mid: int, tracks):
-        self.tracks_map[(user_id, mid)] = tracks
+@dataclass(slots=True)
+class TrackMenu:
+    tracks: list[Track]
+    # The command message, the tracks are sent in reply to it.
+    reply_to: int
 
-    async def build_track_buttons(self, tracks, page_number: int, user_id: int, mid: int):
+
+class MusicService:
+    async def build_track_buttons(self, tracks, page_number: int, token: str):
         count = len(tracks)
-        page_size = 10
-        page_count = (count + page_size - 1) // page_size
+        page_count = (count + PAGE_SIZE - 1) // PAGE_SIZE
 
         buttons = []
-        for index in range((page_number - 1) * page_size, min(page_number * page_size, count)):
+        for index in range((page_number - 1) * PAGE_SIZE, min(page_number * PAGE_SIZE, count)):
             track = tracks[index]
             buttons.append(
                 [InlineKeyboardButton(
                     f"{track.performer} - {track.title}",
-                    callback_data=f"send_music|{index}|{user_id}|{mid}"
+                    callback_data=callback_data("send_music", token, index)
                 )]
             )
 
         navigation_buttons = []
         if page_number > 1:
             navigation_buttons.append(InlineKeyboardButton(
-                "⬅️", callback_data=f"prev_music_page|{page_number - 1}|{user_id}|{mid}"
+                "⬅️", callback_data=callback_data("music_page", token, page_number - 1)
             ))
         else:
             navigation_buttons.append(InlineKeyboardButton("⏺️", callback_data="ignore"))
@@ -56,16 +61,16 @@ class MusicService:
 
         if page_number < page_count:
             navigation_buttons.append(InlineKeyboardButton(
-                "➡️", callback_data=f"next_music_page|{page_number + 1}|{user_id}|{mid}"
+                "➡️", callback_data=callback_data("music_page", token, page_number + 1)
             ))
         else:
             navigation_buttons.append(InlineKeyboardButton("⏺️", callback_data="ignore"))
 
         buttons.append(navigation_buttons)
         buttons.append([InlineKeyboardButton(
-            "⬇️", callback_data=f"send_all_music|{page_size}|{page_number}|{user_id}|{mid}"
+            "⬇️", callback_data=callback_data("send_all_music", token, page_number)
         )])
-        buttons.append([InlineKeyboardButton("🗑️", callback_data="delete_music_menu")])
+        buttons.append([InlineKeyboardButton("🗑️", callback_data=callback_data("delete_music_menu", token))])
 
         return InlineKeyboardMarkup(buttons)
 
@@ -80,97 +85,101 @@ async def music_cmd(c: Client, m: Message, s: Strings):
     parts = m.text.split(None, 1)
 
     if len(parts) == 1:
-        buttons = [[InlineKeyboardButton(s("top_musics"), callback_data=f"get_hits|{user_id}|{m.id}")]]
+        buttons = [[InlineKeyboardButton(s("top_musics"), callback_data=callback_data("get_hits", user_id, m.id))]]
         await m.reply_text(s("music_example"), reply_markup=InlineKeyboardMarkup(buttons))
         return
 
     keyword = parts[1]
     async with Music() as service:
         tracks = await service.search(keyword)
-        music_service.set_tracks(user_id, m.id, tracks)
 
-    tracks = music_service.get_tracks(user_id, m.id)
     if tracks:
+        token = store_state(TrackMenu(tracks, m.id), user_id)
         await m.reply_text(
             s("music_found").format(tracks=len(tracks)),
-            reply_markup=await music_service.build_track_buttons(tracks, 1, user_id, m.id)
+            reply_markup=await music_service.build_track_buttons(tracks, 1, token)
         )
     else:
         await m.reply_text(s("music_not_found"))
 
 
-@Client.on_callback_query(filters.regex("^get_hits"))
+@on_callback("get_hits", int, int)
 @use_chat_lang
-async def send_hits(c: Client, cb: CallbackQuery, s: Strings):
-    _, user_id, mid = cb.data.split("|")
-    user_id, mid = int(user_id), int(mid)
-
+async def send_hits(c: Client, cb: CallbackQuery, user_id: int, mid: int, s: Strings):
     await cb.answer()
 
     async with Music() as service:
         category = s("top_musics")
         tracks = await service.get_top_hits()
-        music_service.set_tracks(user_id, mid, tracks)
 
-    tracks = music_service.get_tracks(user_id, mid)
     if tracks:
+        token = store_state(TrackMenu(tracks, mid), user_id)
         message_text = s("music_category_found").format(tracks=len(tracks), category=category)
         await cb.message.edit_text(
             message_text,
-            reply_markup=await music_service.build_track_buttons(tracks, 1, user_id, mid)
+            reply_markup=await music_service.build_track_buttons(tracks, 1, token)
         )
     else:
         await cb.message.edit_text(s("no_tracks_found"))
 
 
-@Client.on_callback_query(filters.regex("^send_music"))
-async def play_track(c: Client, cb: CallbackQuery):
-    _, track_index, user_id, mid = cb.data.split("|")
-    track_index, user_id, mid = int(track_index), int(user_id), int(mid)
-
+@on_callback("send_music", CallbackState, int)
+@use_chat_lang
+async def play_track(
+    c: Client, cb: CallbackQuery, state: CallbackState, track_index: int, s: Strings
+):
     await cb.answer()
-    await cb.message.delete()
+    state.drop()
 
-    tracks = music_service.get_tracks(user_id, mid)
-    if track_index < len(tracks):
-        async with Music() as service:
-            track = tracks[track_index]
-            audio_bytes = await service.get_audio_bytes(track)
+    menu = state.value
+    await enqueue_tracks(cb, s, menu.reply_to, menu.tracks[track_index : track_index + 1])
 
-            audio_file = io.BytesIO(audio_bytes)
-            audio_file.name = f"{track.title}.mp3"
 
-            audio = File(audio_file)
-            duration = audio.info.length
+@on_callback("send_all_music", CallbackState, int)
+@use_chat_lang
+async def send_all_tracks(
+    c: Client, cb: CallbackQuery, state: CallbackState, page_number: int, s: Strings
+):
+    await cb.answer()
+    state.drop()
 
-            await cb.message.reply_audio(
-                audio_file,
-                title=track.title,
-                duration=int(duration),
-                performer=track.performer,
-                reply_to_message_id=mid
-            )
+    menu = state.value
+    start_index = (page_number - 1) * PAGE_SIZE
+    await enqueue_tracks(cb, s, menu.reply_to, menu.tracks[start_index : start_index + PAGE_SIZE])
 
-    if (user_id, mid) in music_service.tracks_map:
-        del music_service.tracks_map[(user_id, mid)]
 
+async def enqueue_tracks(cb: CallbackQuery, s: Strings, mid: int, tracks: list[Track]):
+    """Send the tracks, the menu shows their progress meanwhile."""
+    if not tracks:
+        await cb.message.delete()
+        return
 
-@Client.on_callback_query(filters.regex("^send_all_music"))
-async def send_all_tracks(c: Client, cb: CallbackQuery):
-    _, page_size, page_number, user_id, mid = cb.data.split("|")
-    page_size, page_number, user_id, mid = int(page_size), int(page_number), int(user_id), int(mid)
+    await cb.message.edit_text(s("music_sending").format(index=1, count=len(tracks)))
+    await enqueue(
+        "music",
+        {
+            "chat_id": cb.message.chat.id,
+            "reply_to": mid,
+            "tracks": [asdict(track) for track in tracks],
+        },
+        status=cb.message,
+    )
 
-    await cb.answer()
-    await cb.message.delete()
 
-    tracks = music_service.get_tracks(user_id, mid)
-    start_index = (page_number - 1) * page_size
-    end_index = min(start_index + page_size, len(tracks))
+@job_handler("music")
+async def send_tracks_job(c: Client, job: Job):
+    tracks = [Track.from_dict(track) for track in job.payload["tracks"]]
+    s = get_strings(await get_lang(job.payload["chat_id"], c))
 
-    for index in range(start_index, end_index):
-        track = tracks[index]
-        async with Music() as service:
-            audio_bytes = await service.get_audio_bytes(track)
+    # After a restart, carry on from the first track not sent yet.
+    sent = job.progress.get("sent", 0)
+    async with Music() as service, ProgressReporter(job.edit_status) as progress:
+        for index in range(sent, len(tracks)):
+            track = tracks[index]
+            header = s("music_sending").format(index=index + 1, count=len(tracks)) + "\n"
+            audio_bytes = await service.get_audio_bytes(
+                track, progress.transfer(header + s("progress_downloading"))
+            )
 
             audio_file = io.BytesIO(audio_bytes)
             audio_file.name = f"{track.title}.mp3"
@@ -178,45 +187,39 @@ async def send_all_tracks(c: Client, cb: CallbackQuery):
             audio = File(audio_file)
             duration = audio.info.length
 
-            await cb.message.reply_audio(
+            await c.send_audio(
+                job.payload["chat_id"],
                 audio_file,
                 title=track.title,
                 duration=int(duration),
                 performer=track.performer,
-                reply_to_message_id=mid
+                reply_to_message_id=job.payload["reply_to"],
+                progress=progress.transfer(header + s("progress_uploading")),
             )
+            await job.set_progress(sent=index + 1, total=len(tracks))
 
+    await job.delete_status()
 
-    if (user_id, mid) in music_service.tracks_map:
-        del music_service.tracks_map[(user_id, mid)]
-
-
-@Client.on_callback_query(filters.regex("(^next_music_page)|(^prev_music_page)"))
-async def change_page(c: Client, cb: CallbackQuery):
-    _, page_number, user_id, mid = cb.data.split("|")
-    page_number, user_id, mid = int(page_number), int(user_id), int(mid)
 
-    tracks = music_service.get_tracks(user_id, mid)
+@on_callback("music_page", CallbackState, int)
+async def change_page(c: Client, cb: CallbackQuery, state: CallbackState, page_number: int):
     await cb.answer()
     await cb.message.edit_reply_markup(
-        reply_markup=await music_service.build_track_buttons(tracks, page_number, user_id, mid)
+        reply_markup=await music_service.build_track_buttons(
+            state.value.tracks, page_number, state.token
+        )
     )
 
 
-@Client.on_callback_query(filters.regex(r"^delete_music_menu"))
-async def delete_music_menu(c: Client, query: CallbackQuery):
+@on_callback("delete_music_menu", CallbackState)
+async def delete_music_menu(c: Client, query: CallbackQuery, state: CallbackState):
     try:
-        mid = query.message.id
-
+        state.drop()
         await query.message.delete()
 
         if query.message.reply_to_message:
             await query.message.reply_to_message.delete()
 
-        keys_to_delete = [key for key in music_service.tracks_map if key[1] == mid]
-        for key in keys_to_delete:
-            del music_service.tracks_map[key]
-
     except Exception as e:
         logger.error(e)
 
@@ -10,8 +10,10 @@ from hydrogram.types import Message
 from playwright.async_api import async_playwright
 
 from config import PREFIXES
+from miku.jobs import Job, enqueue, job_handler
 from miku.utils import commands
-from miku.utils.localization import Strings, use_chat_lang
+from miku.utils.localization import Strings, get_lang, get_strings, use_chat_lang
+from miku.utils.progress import ProgressReporter
 
 
 @Client.on_message(filters.command("print", PREFIXES))
@@ -45,23 +47,38 @@ async def prints(c: Client, m: Message, s: Strings):
         return
 
     sent = await m.reply_text(s("print_taking_screenshot"))
+    await enqueue("print", {"url": target_url, "chat_id": m.chat.id, "reply_to": m.id}, status=sent)
+
+
+@job_handler("print")
+async def print_job(c: Client, job: Job):
+    payload = job.payload
+    s = get_strings(await get_lang(payload["chat_id"], c))
 
     try:
-        screenshot_path = await screenshot_page(target_url)
-    except Exception as e:
-        print(e)
-        return
+        screenshot_path = await screenshot_page(payload["url"])
+    except Exception:
+        # The page may just be slow or down for a moment.
+        if not job.last_attempt:
+            raise
+        screenshot_path = None
 
     if not screenshot_path:
-        await sent.edit_text(s("print_failed"))
+        await job.edit_status(s("print_failed"))
         return
 
     try:
-        await m.reply_photo(photo=screenshot_path)
+        async with ProgressReporter(job.edit_status) as progress:
+            await c.send_photo(
+                payload["chat_id"],
+                screenshot_path,
+                reply_to_message_id=payload["reply_to"],
+                progress=progress.transfer(s("progress_uploading")),
+            )
     except Exception as e:
-        await sent.edit_text(s("print_send_failed").format(error=str(e)))
+        await job.edit_status(s("print_send_failed").format(error=str(e)))
     else:
-        await sent.delete()
+        await job.delete_status()
     finally:
         try:
             os.remove(screenshot_path)
@@ -52,7 +52,7 @@ async def show_rules(c: Client, m: Message, s: Strings):
 @stop_here
 async def show_rules_pvt(c: Client, m: Message, s: Strings):
     cid_one = m.text.split("_")[1]
-    rules = await get_rules(cid_one if cid_one.startswith("-") else f"-{cid_one}")
+    rules = await get_rules(int(cid_one if cid_one.startswith("-") else f"-{cid_one}"))
     rulestxt, rules_buttons = button_parser(rules)
 
     if not rulestxt:
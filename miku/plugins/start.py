@@ -14,12 +14,13 @@ from hydrogram.types import (
 from config import PREFIXES
 from miku import __commit__, __version_number__
 from miku.utils import commands
+from miku.utils.callbacks import callback_data, on_callback
 from miku.utils.localization import Strings, use_chat_lang
 
 
 # Using a low priority group so deeplinks will run before this and stop the propagation.
 @Client.on_message(filters.command("start", PREFIXES) & filters.private, group=2)
-@Client.on_callback_query(filters.regex("^start_back$"))
+@on_callback("start_back")
 @use_chat_lang
 async def start_pvt(c: Client, m: Message | CallbackQuery, s: Strings):
     if isinstance(m, CallbackQuery):
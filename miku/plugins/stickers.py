@@ -6,7 +6,7 @@ from io import BytesIO
 from emoji_regex import emoji_regex
 from hydrogram import Client, filters
 from hydrogram.enums import MessageEntityType
-from hydrogram.errors import PeerIdInvalid, StickersetInvalid
+from hydrogram.errors import BadRequest, PeerIdInvalid, StickersetInvalid
 from hydrogram.raw.functions.messages import GetStickerSet, SendMedia
 from hydrogram.raw.functions.stickers import AddStickerToSet, CreateStickerSet
 from hydrogram.raw.types import (
@@ -20,8 +20,9 @@ from hydrogram.types import InlineKeyboardButton, InlineKeyboardMarkup, Message
 from PIL import Image, ImageOps
 
 from config import LOG_CHAT, PREFIXES
+from miku.jobs import Job, enqueue, job_handler
 from miku.utils import http
-from miku.utils.localization import Strings, use_chat_lang
+from miku.utils.localization import Strings, get_lang, get_strings, use_chat_lang
 
 
 @Client.on_message(filters.command(["kang", "kibe", "steal"], PREFIXES))
@@ -31,11 +32,9 @@ async def kang_sticker(c: Client, m: Message, s: Strings):
     bot_username = c.me.username
     sticker_emoji = "🤔"
     packnum = 0
-    packname_found = False
     resize = False
     animated = False
     reply = m.reply_to_message
-    user = await c.resolve_peer(m.from_user.username or m.from_user.id)
     if reply and reply.media:
         if (
             not reply.photo and reply.document and "image" in reply.document.mime_type
@@ -62,18 +61,14 @@ async def kang_sticker(c: Client, m: Message, s: Strings):
 
         if len(m.command) > 1 and m.command[1].isdigit() and int(m.command[1]) > 0:
             # provide pack number to kang in desired pack
-            packnum = m.command.pop(1)
+            packnum = int(m.command.pop(1))
             packname = f"{pack_prefix}{packnum}_{m.from_user.id}_by_{bot_username}"
         if len(m.command) > 1:
             # matches all valid emojis in input
             sticker_emoji = (
                 "".join(set(emoji_regex.findall("".join(m.command[1:])))) or sticker_emoji
             )
-        file = await c.download_media(m.reply_to_message, in_memory=True)
-        if not file:
-            # Failed to download
-            await prog_msg.delete()
-            return
+        source = {"file_id": (reply.photo or reply.document or reply.sticker).file_id}
     elif m.entities and len(m.entities) > 1:
         packname = f"a_{m.from_user.id}_by_{bot_username}"
         pack_prefix = "a"
@@ -89,28 +84,70 @@ async def kang_sticker(c: Client, m: Message, s: Strings):
         if not img_url:
             await prog_msg.delete()
             return
-        try:
-            r = await http.get(img_url)
-            if r.status_code == 200:
-                file = BytesIO(r.content)
-                file.name = "sticker.png"
-        except Exception as r_e:
-            await prog_msg.edit_text(f"{r_e.__class__.__name__}: {r_e}")
-            return
         if len(m.command) > 2:
             if m.command[2].isdigit() and int(m.command[2]) > 0:
-                packnum = m.command.pop(2)
+                packnum = int(m.command.pop(2))
                 packname = f"a{packnum}_{m.from_user.id}_by_{bot_username}"
             if len(m.command) > 2:
                 sticker_emoji = (
                     "".join(set(emoji_regex.findall("".join(m.command[2:])))) or sticker_emoji
                 )
             resize = True
+        source = {"url": img_url}
     else:
         await prog_msg.delete()
         return
+
+    await enqueue(
+        "kang",
+        {
+            **source,
+            "chat_id": m.chat.id,
+            "user_id": m.from_user.id,
+            "username": m.from_user.username,
+            "sticker_emoji": sticker_emoji,
+            "packname": packname,
+            "pack_prefix": pack_prefix,
+            "packnum": packnum,
+            "resize": resize,
+            "animated": animated,
+        },
+        status=prog_msg,
+    )
+
+
+@job_handler("kang")
+async def kang_job(c: Client, job: Job):
+    payload = job.payload
+    s = get_strings(await get_lang(payload["chat_id"], c))
+    bot_username = c.me.username
+    user_id = payload["user_id"]
+    sticker_emoji = payload["sticker_emoji"]
+    packname = payload["packname"]
+    pack_prefix = payload["pack_prefix"]
+    packnum = payload["packnum"]
+    animated = payload["animated"]
+    packname_found = False
+
+    # An earlier attempt added the sticker but failed after, it must not be added again.
+    if "added_to" in job.progress:
+        await show_kanged(job, s, job.progress["added_to"], sticker_emoji)
+        return
+
     try:
-        if resize:
+        if "file_id" in payload:
+            file = await c.download_media(payload["file_id"], in_memory=True)
+            if not file:
+                # Failed to download
+                await job.delete_status()
+                return
+        else:
+            r = await http.get(payload["url"])
+            if r.status_code == 200:
+                file = BytesIO(r.content)
+                file.name = "sticker.png"
+        user = await c.resolve_peer(payload["username"] or user_id)
+        if payload["resize"]:
             file = resize_image(file)
         max_stickers = 50 if animated else 120
         while not packname_found:
@@ -123,7 +160,7 @@ async def kang_sticker(c: Client, m: Message, s: Strings):
                 )
                 if stickerset.set.count >= max_stickers:
                     packnum += 1
-                    packname = f"{pack_prefix}_{packnum}_{m.from_user.id}_by_{bot_username}"
+                    packname = f"{pack_prefix}_{packnum}_{user_id}_by_{bot_username}"
                 else:
                     packname_found = True
             except StickersetInvalid:
@@ -137,13 +174,13 @@ async def kang_sticker(c: Client, m: Message, s: Strings):
                     mime_type="image/png",
                     attributes=[DocumentAttributeFilename(file_name="sticker.png")],
                 ),
-                message=f"#Sticker kang by UserID -> {m.from_user.id}",
+                message=f"#Sticker kang by UserID -> {user_id}",
                 random_id=c.rnd_id(),
             )
         )
         stkr_file = media.updates[-1].message.media.document
         if packname_found:
-            await prog_msg.edit_text(s("kang_use_existing_pack"))
+            await job.edit_status(s("kang_use_existing_pack"))
             await c.invoke(
                 AddStickerToSet(
                     stickerset=InputStickerSetShortName(short_name=packname),
@@ -157,10 +194,11 @@ async def kang_sticker(c: Client, m: Message, s: Strings):
                     ),
                 )
             )
+            await job.set_progress(added_to=packname)
         else:
-            await prog_msg.edit_text(s("kang_create_new_pack_string"))
-            u_name = m.from_user.username
-            u_name = f"@{u_name}" if u_name else str(m.from_user.id)
+            await job.edit_status(s("kang_create_new_pack_string"))
+            u_name = payload["username"]
+            u_name = f"@{u_name}" if u_name else str(user_id)
             stkr_title = f"{u_name}'s "
             if animated:
                 stkr_title += "Anim. "
@@ -185,8 +223,9 @@ async def kang_sticker(c: Client, m: Message, s: Strings):
                         ],
                     )
                 )
+                await job.set_progress(added_to=packname)
             except PeerIdInvalid:
-                await prog_msg.edit_text(
+                await job.edit_status(
                     s("kang_cant_create_sticker_pack_string"),
                     reply_markup=InlineKeyboardMarkup([
                         [InlineKeyboardButton("/start", url=f"https://t.me/{bot_username}?start")]
@@ -194,20 +233,27 @@ async def kang_sticker(c: Client, m: Message, s: Strings):
                 )
                 return
     except Exception as all_e:
-        await prog_msg.edit_text(f"{all_e.__class__.__name__} : {all_e}")
+        # Telegram refusing the sticker won't change, network errors may.
+        if not job.last_attempt and not isinstance(all_e, BadRequest):
+            raise
+        await job.edit_status(f"{all_e.__class__.__name__} : {all_e}")
     else:
-        markup = InlineKeyboardMarkup([
-            [
-                InlineKeyboardButton(
-                    s("kang_view_sticker_pack_btn"),
-                    url=f"t.me/addstickers/{packname}",
-                )
-            ]
-        ])
-        kanged_success_msg = s("kang_sticker_kanged_string")
-        await prog_msg.edit_text(
-            kanged_success_msg.format(sticker_emoji=sticker_emoji), reply_markup=markup
-        )
+        await show_kanged(job, s, packname, sticker_emoji)
+
+
+async def show_kanged(job: Job, s: Strings, packname: str, sticker_emoji: str):
+    markup = InlineKeyboardMarkup([
+        [
+            InlineKeyboardButton(
+                s("kang_view_sticker_pack_btn"),
+                url=f"t.me/addstickers/{packname}",
+            )
+        ]
+    ])
+    kanged_success_msg = s("kang_sticker_kanged_string")
+    await job.edit_status(
+        kanged_success_msg.format(sticker_emoji=sticker_emoji), reply_markup=markup
+    )
 
 
 def resize_image(file: str) -> BytesIO:
@@ -12,7 +12,6 @@ import sys
 import time
 import traceback
 from contextlib import redirect_stdout, suppress
-from sqlite3 import IntegrityError, OperationalError
 from typing import TYPE_CHECKING
 
 from hydrogram import Client, filters
@@ -20,11 +19,18 @@ from hydrogram.enums import ChatType
 from hydrogram.errors import RPCError
 from meval import meval
 
-from config import DATABASE_PATH
-from miku.database import database
+from miku.database import chats, database
+from miku.database.backends import SQLiteBackend
+from miku.database.backup import create_backup
+from miku.database.jobs import get_job_counts
+from miku.database.maintenance import run_maintenance
+from miku.database.localization import invalidate_lang
 from miku.database.restarted import set_restarted
+from miku.database.settings import invalidate_chat_settings
+from miku.database.stats import query_stats
+from miku.jobs import job_runner
 from miku.utils import sudofilter
-from miku.utils.localization import Strings, use_chat_lang
+from miku.utils.localization import Strings, reload_locales, use_chat_lang
 from miku.utils.utils import shell_exec
 
 if TYPE_CHECKING:
@@ -32,8 +38,6 @@ if TYPE_CHECKING:
 
 prefix: list | str = "!"
 
-conn = database.get_conn()
-
 
 @Client.on_message(filters.command("sudos", prefix) & sudofilter)
 async def sudos(c: Client, m: Message):
@@ -71,7 +75,9 @@ async def upgrade(c: Client, m: Message, s: Strings):
     else:
         await sm.edit_text(s("sudos_restarting"))
         await set_restarted(sm.chat.id, sm.id)
-        await conn.commit()
+        # The running jobs are queued again, instead of waiting out their lease.
+        await job_runner.stop()
+        await database.flush()
         args = [sys.executable, "-m", "miku"]
         os.execv(sys.executable, args)  # skipcq: BAN-B606
 
@@ -102,19 +108,24 @@ async def execsql(c: Client, m: Message):
     command = m.text.split(maxsplit=1)[1]
 
     try:
-        ex = await conn.execute(command)
-    except (IntegrityError, OperationalError) as e:
+        ret = await database.fetchall(command, writer=True)
+    except database.Error as e:
         await m.reply_text(f"SQL executed with an error: {e.__class__.__name__}: {e}")
         return
 
-    ret = await ex.fetchall()
-    await conn.commit()
+    await database.flush()
+    # The statement may have changed any chat's settings or language, or the chats themselves.
+    invalidate_chat_settings()
+    invalidate_lang()
+    chats.chat_types.clear()
+    chats.known_chats.clear()
+    await chats.load_known_chats()
 
     if not ret:
         await m.reply_text("SQL executed successfully and without any return.")
         return
 
-    res = "|".join([name[0] for name in ex.description]) + "\n"
+    res = "|".join(ret[0].keys()) + "\n"
     res += "\n".join(["|".join(str(s) for s in items) for items in ret])
 
     if len(res) < 3500:
@@ -129,12 +140,128 @@ async def execsql(c: Client, m: Message):
     await m.reply_document(bio)
 
 
+@Client.on_message(filters.command("maintenance", prefix) & sudofilter)
+async def maintenance(c: Client, m: Message):
+    sent = await m.reply_text("Running the database maintenance…")
+    report = await run_maintenance(database)
+    await sent.edit_text(
+        f"<b>Took:</b> <code>{report.duration:.2f}s</code>\n"
+        f"<b>Pruned rows:</b> <code>{report.pruned_rows}</code>\n"
+        f"<b>Reclaimed pages:</b> <code>{report.reclaimed_pages}</code>"
+    )
+
+
+@Client.on_message(filters.command("dbstats", prefix) & sudofilter)
+async def dbstats(c: Client, m: Message):
+    arg = m.command[1] if len(m.command) > 1 else None
+
+    if arg == "reset":
+        query_stats.reset()
+        await m.reply_text("The database stats were reset.")
+        return
+
+    if arg == "export":
+        bio = io.BytesIO(query_stats.render_metrics().encode())
+        bio.name = "database.prom"
+        await m.reply_document(bio)
+        return
+
+    def top(series: dict, limit: int = 8) -> str:
+        rows = sorted(series.items(), key=lambda item: item[1].sum, reverse=True)[:limit]
+        return "\n".join(
+            f"<code>{hist.sum * 1000:.0f}ms {hist.count}x</code> {html.escape(name[:80])}"
+            for name, hist in rows
+        )
+
+    queries = sum(hist.count for hist in query_stats.statements.values())
+    per_update = query_stats.per_update
+    lookups = chats.known_chats_hits + chats.known_chats_misses
+    text = (
+        f"<b>Since:</b> <code>{time.strftime('%Y-%m-%d %H:%M:%S', time.localtime(query_stats.since))}</code>\n"
+        f"<b>Queries:</b> <code>{queries}</code> (<code>{query_stats.slow_queries}</code> slow)\n"
+        f"<b>Queries per update:</b> <code>{per_update.sum / max(per_update.count, 1):.2f}</code>"
+        f" avg, <code>{per_update.quantile(0.99):g}</code> p99,"
+        f" <code>{per_update.max:g}</code> max\n"
+        f"<b>Known chats:</b> <code>{len(chats.known_chats)}</code>,"
+        f" <code>{chats.known_chats_hits / max(lookups, 1):.1%}</code> hit rate\n\n"
+        f"<b>Handlers:</b>\n{top(query_stats.handlers) or 'None'}\n\n"
+        f"<b>Statements:</b>\n{top(query_stats.statements) or 'None'}"
+    )
+    await m.reply_text(text)
+
+
+@Client.on_message(filters.command("schedstats", prefix) & sudofilter)
+async def schedstats(c: Client, m: Message):
+    dispatcher = c.dispatcher
+    arg = m.command[1] if len(m.command) > 1 else None
+
+    if arg == "reset":
+        dispatcher.reset_stats()
+        c.outbound.reset_stats()
+        await m.reply_text("The scheduling stats were reset.")
+        return
+
+    if arg == "export":
+        bio = io.BytesIO(dispatcher.render_metrics().encode())
+        bio.name = "scheduler.prom"
+        await m.reply_document(bio)
+        return
+
+    lines = [
+        f"<b>Lanes:</b> <code>{len(dispatcher.lanes)}</code>, heavy commands running:"
+        f" <code>{dispatcher.heavy_running}/{dispatcher.heavy_limit}</code>\n"
+    ]
+    for priority, hist in dispatcher.wait_times.items():
+        lines.append(
+            f"<b>{priority.name.capitalize()}:</b> <code>{dispatcher.queued[priority]}</code> queued"
+            f" (<code>{dispatcher.max_queued[priority]}</code> max), <code>{hist.count}</code> handled,"
+            f" <code>{hist.quantile(0.99) * 1000:.0f}ms</code> p99 wait"
+        )
+    lines.append(
+        f"\n<b>Sends:</b> <code>{c.outbound.delayed}</code> delayed by the rate limits,"
+        f" <code>{c.outbound.flood_waits}</code> FloodWaits,"
+        f" <code>{len(c.outbound.buckets)}</code> chats tracked"
+    )
+    await m.reply_text("\n".join(lines))
+
+
+@Client.on_message(filters.command("jobs", prefix) & sudofilter)
+async def jobs(c: Client, m: Message):
+    counts = await get_job_counts()
+    lines = [
+        f"<b>Queued:</b> <code>{counts.get('queued', 0)}</code>,"
+        f" <b>running:</b> <code>{counts.get('running', 0)}</code>,"
+        f" <b>failed:</b> <code>{counts.get('failed', 0)}</code>"
+    ]
+    for job in job_runner.running.values():
+        progress = " ".join(f"{key}={value}" for key, value in job.progress.items())
+        lines.append(
+            f"<code>{job.id}</code> {job.kind}, attempt {job.attempts} {html.escape(progress)}"
+        )
+    await m.reply_text("\n".join(lines))
+
+
+@Client.on_message(filters.command("reloadlocales", prefix) & sudofilter)
+async def reloadlocales(c: Client, m: Message):
+    started = time.perf_counter()
+    try:
+        count = reload_locales()
+    except Exception as e:
+        await m.reply_text(f"Unable to reload the locales: {e.__class__.__name__}: {html.escape(str(e))}")
+        return
+
+    await m.reply_text(
+        f"Reloaded {count} locales in <code>{(time.perf_counter() - started) * 1000:.0f}ms</code>."
+    )
+
+
 @Client.on_message(filters.command("restart", prefix) & sudofilter)
 @use_chat_lang
 async def restart(c: Client, m: Message, s: Strings):
     sent = await m.reply_text(s("sudos_restarting"))
     await set_restarted(sent.chat.id, sent.id)
-    await conn.commit()
+    await job_runner.stop()
+    await database.flush()
     args = [sys.executable, "-m", "miku"]
     os.execv(sys.executable, args)  # skipcq: BAN-B606
 
@@ -173,7 +300,14 @@ async def del_message(c: Client, m: Message):
     & ~filters.via_bot
 )
 async def backupcmd(c: Client, m: Message):
-    await m.reply_document(DATABASE_PATH)
+    if not isinstance(database, SQLiteBackend):
+        await m.reply_text("Only SQLite databases can be backed up from here, use pg_dump instead.")
+        return
+
+    sent = await m.reply_text("Backing up the database…")
+    archive = await create_backup(database)
+    await m.reply_document(str(archive))
+    await sent.delete()
 
 
 @Client.on_message(filters.command("upload", prefix) & sudofilter)
@@ -2,7 +2,14 @@
 # Copyright (c) 2018-2024 Amano LLC
 
 from hydrogram import Client, filters
-from hydrogram.types import ChatPermissions, ChatPrivileges, Message
+from hydrogram.enums import ChatMemberStatus
+from hydrogram.types import (
+    ChatMember,
+    ChatMemberUpdated,
+    ChatPermissions,
+    ChatPrivileges,
+    Message,
+)
 
 from config import PREFIXES
 from miku.database.warns import (
@@ -12,10 +19,11 @@ from miku.database.warns import (
     get_warns_limit,
     reset_warns,
     set_warn_action,
+    set_warned_user_left,
     set_warns_limit,
 )
 from miku.utils import commands, get_target_user
-from miku.utils.consts import ADMIN_STATUSES
+from miku.utils.admins import get_admin
 from miku.utils.decorators import require_admin
 from miku.utils.localization import Strings, use_chat_lang
 
@@ -38,16 +46,14 @@ def get_warn_reason_text(c: Client, m: Message) -> Message:
 async def warn_user(c: Client, m: Message, s: Strings):
     target_user = await get_target_user(c, m)
     warns_limit = await get_warns_limit(m.chat.id)
-    check_admin = await m.chat.get_member(target_user.id)
     reason = get_warn_reason_text(c, m)
     warn_action = await get_warn_action(m.chat.id)
 
-    if check_admin.status in ADMIN_STATUSES:
+    if await get_admin(m.chat, target_user.id):
         await m.reply_text(s("warn_cant_admin"))
         return
 
-    await add_warns(m.chat.id, target_user.id, 1)
-    user_warns = await get_warns(m.chat.id, target_user.id)
+    user_warns = await add_warns(m.chat.id, target_user.id, 1)
     if user_warns >= warns_limit:
         if warn_action == "ban":
             await m.chat.ban_member(target_user.id)
@@ -132,6 +138,22 @@ async def set_warns_action_cmd(c: Client, m: Message, s: Strings):
     await m.reply_text(s("warns_action_set_string").format(action=warn_action_txt))
 
 
+def in_chat(member: ChatMember | None) -> bool:
+    if member is None or member.status in {ChatMemberStatus.LEFT, ChatMemberStatus.BANNED}:
+        return False
+    # Restricted users stay so after leaving.
+    return member.status != ChatMemberStatus.RESTRICTED or member.is_member
+
+
+# In a group of its own, so the greetings still get the update.
+@Client.on_chat_member_updated(group=1)
+async def track_warned_members(c: Client, u: ChatMemberUpdated):
+    was_in_chat, is_in_chat = in_chat(u.old_chat_member), in_chat(u.new_chat_member)
+    if was_in_chat != is_in_chat:
+        user = (u.new_chat_member or u.old_chat_member).user
+        await set_warned_user_left(u.chat.id, user.id, not is_in_chat)
+
+
 commands.add_command("warn", "admin")
 commands.add_command("setwarnslimit", "admin")
 commands.add_command("resetwarns", "admin")
@@ -18,16 +18,17 @@ from hydrogram.types import (
 
 from config import PREFIXES
 from miku.utils import commands, inline_commands
+from miku.utils.callbacks import CallbackState, callback_data, on_callback, store_state
 from miku.utils.localization import Strings, use_chat_lang
 from miku.utils.xashlib import ms_list, remove_color_tags, get_servers, query_servers
 
 
 class ServerManager:
     def __init__(self):
-        self.servers_map = {}
+        self.servers_list = []
 
-    async def build_server_keyboard(self, user_id: int, mid: int, page: int):
-        servers_list = self.servers_map.get((user_id, mid), [])
+    async def build_server_keyboard(self, token: str, page: int):
+        servers_list = self.servers_list
         keyboard = []
 
         servers_per_page = 10
@@ -40,24 +41,24 @@ class ServerManager:
             hostname, _, players, maxplayers, _ = servers_list[i]
             keyboard.append([InlineKeyboardButton(
                 f"{hostname} ({players}/{maxplayers})",
-                callback_data=f"server_info_{user_id}_{mid}_{i}"
+                callback_data=callback_data("server_info", token, i)
             )])
 
         nav_buttons = []
         if start_index > 0:
-            nav_buttons.append(InlineKeyboardButton("⬅️", callback_data=f"page_{user_id}_{mid}_{page - 1}"))
+            nav_buttons.append(InlineKeyboardButton("⬅️", callback_data=callback_data("server_page", token, page - 1)))
         else:
             nav_buttons.append(InlineKeyboardButton("⏺️", callback_data="ignore"))
 
         nav_buttons.append(InlineKeyboardButton(f"{page + 1}/{page_count}", callback_data="ignore"))
 
         if end_index < total_servers:
-            nav_buttons.append(InlineKeyboardButton("➡️", callback_data=f"page_{user_id}_{mid}_{page + 1}"))
+            nav_buttons.append(InlineKeyboardButton("➡️", callback_data=callback_data("server_page", token, page + 1)))
         else:
             nav_buttons.append(InlineKeyboardButton("⏺️", callback_data="ignore"))
 
         keyboard.append(nav_buttons)
-        keyboard.append([InlineKeyboardButton("🗑️", callback_data="delete_server_menu")])
+        keyboard.append([InlineKeyboardButton("🗑️", callback_data=callback_data("delete_server_menu", token))])
 
         return InlineKeyboardMarkup(keyboard)
 
@@ -89,9 +90,6 @@ class ServerManager:
             self.servers_list.append((remove_color_tags(i['host']), i['map'], i['numcl'], i['maxcl'], server_info))
 
 
-server_manager = ServerManager()
-
-
 @Client.on_message(filters.command("xash", PREFIXES))
 @use_chat_lang
 async def xash_chat(c: Client, m: Message, s: Strings):
@@ -103,12 +101,12 @@ async def xash_chat(c: Client, m: Message, s: Strings):
         return
 
     gamedir = parts[1]
+    server_manager = ServerManager()
     await server_manager.get_servers_info(gamedir, s)
 
     if server_manager.servers_list:
-        mid = m.id
-        server_manager.servers_map[(user_id, mid)] = server_manager.servers_list
-        keyboard = await server_manager.build_server_keyboard(user_id, mid, 0)
+        token = store_state(server_manager, user_id)
+        keyboard = await server_manager.build_server_keyboard(token, 0)
         await m.reply_text(
             s("xash_select_server").format(count=len(server_manager.servers_list)),
             reply_markup=keyboard
@@ -146,20 +144,16 @@ async def xash_inline(c: Client, m: InlineQuery, s: Strings):
     del temp_manager
 
 
-@Client.on_callback_query(filters.regex(r"^page_"))
-async def handle_pagination(c: Client, query: CallbackQuery):
-    _, user_id, mid, page = query.data.split("_")
-    user_id, mid, page = int(user_id), int(mid), int(page)
-    keyboard = await server_manager.build_server_keyboard(user_id, mid, page)
+@on_callback("server_page", CallbackState, int)
+async def handle_pagination(c: Client, query: CallbackQuery, state: CallbackState, page: int):
+    keyboard = await state.value.build_server_keyboard(state.token, page)
     await query.answer()
     await query.message.edit_reply_markup(reply_markup=keyboard)
 
 
-@Client.on_callback_query(filters.regex(r"^server_info_"))
-async def handle_server_info(c: Client, query: CallbackQuery):
-    _, _, user_id, mid, index = query.data.split("_")
-    user_id, mid, index = int(user_id), int(mid), int(index)
-    servers_list = server_manager.servers_map.get((user_id, mid), [])
+@on_callback("server_info", CallbackState, int)
+async def handle_server_info(c: Client, query: CallbackQuery, state: CallbackState, index: int):
+    servers_list = state.value.servers_list
     if index < len(servers_list):
         server_info = servers_list[index][-1]
         await query.message.edit_text(server_info)
@@ -167,20 +161,15 @@ async def handle_server_info(c: Client, query: CallbackQuery):
         await query.answer("Invalid server index.")
 
 
-@Client.on_callback_query(filters.regex(r"^delete_server_menu$"))
-async def delete_server_menu(c: Client, query: CallbackQuery):
+@on_callback("delete_server_menu", CallbackState)
+async def delete_server_menu(c: Client, query: CallbackQuery, state: CallbackState):
     try:
-        mid = query.message.id
-
+        state.drop()
         await query.message.delete()
 
         if query.message.reply_to_message:
             await query.message.reply_to_message.delete()
 
-        keys_to_delete = [key for key in server_manager.servers_map if key[1] == mid]
-        for key in keys_to_delete:
-            del server_manager.servers_map[key]
-
     except Exception as e:
         logger.error(e)
 
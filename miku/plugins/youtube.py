@@ -4,20 +4,22 @@
 import datetime
 import io
 import re
-import shutil
 import tempfile
-from pathlib import Path
 
 from hydrogram import Client, filters
 from hydrogram.errors import BadRequest
 from hydrogram.helpers import ikb
 from hydrogram.types import CallbackQuery, Message
 from yt_dlp import YoutubeDL
+from yt_dlp.utils import DownloadError
 
 from config import PREFIXES
+from miku.jobs import Job, enqueue, job_handler
 from miku.utils import commands, http, pretty_size
+from miku.utils.callbacks import CallbackState, callback_data, on_callback, store_state
 from miku.utils.decorators import aiowrap
-from miku.utils.localization import Strings, use_chat_lang
+from miku.utils.localization import Strings, get_lang, get_strings, use_chat_lang
+from miku.utils.progress import ProgressReporter
 
 YOUTUBE_REGEX = re.compile(
     r"(?m)http(?:s?):\/\/(?:www\.)?(?:music\.)?youtu(?:be\.com\/(watch\?v=|shorts/)|\.be\/|)([\w\-\_]*)(&(amp;)?[\w\?=]*)?"
@@ -102,16 +104,19 @@ async def ytdlcmd(c: Client, m: Message, s: Strings):
         if f["ext"] == "mp4" and f.get("filesize") is not None:
             vfsize = f["filesize"] or 0
 
+    token = store_state(
+        {
+            "video_id": yt["id"],
+            "sizes": {"aud": int(afsize), "vid": int(vfsize)},
+            "temp": int(temp),
+            "reply_to": m.id,
+        },
+        user,
+    )
     keyboard = [
         [
-            (
-                s("ytdl_audio_button"),
-                f"_aud.{yt['id']}|{afsize}|{temp}|{m.chat.id}|{user}|{m.id}",
-            ),
-            (
-                s("ytdl_video_button"),
-                f"_vid.{yt['id']}|{vfsize}|{temp}|{m.chat.id}|{user}|{m.id}",
-            ),
+            (s("ytdl_audio_button"), callback_data("ytdl", token, "aud")),
+            (s("ytdl_video_button"), callback_data("ytdl", token, "vid")),
         ]
     ]
 
@@ -128,84 +133,101 @@ async def ytdlcmd(c: Client, m: Message, s: Strings):
     await m.reply_text(text, reply_markup=ikb(keyboard))
 
 
-@Client.on_callback_query(filters.regex("^(_(vid|aud))"))
+@on_callback("ytdl", CallbackState, str)
 @use_chat_lang
-async def cli_ytdl(c: Client, cq: CallbackQuery, s: Strings):
-    data, fsize, temp, cid, userid, mid = cq.data.split("|")
-    if cq.from_user.id != int(userid):
-        await cq.answer(s("ytdl_button_denied"), cache_time=60)
-        return
-    if int(fsize) > MAX_FILESIZE:
+async def cli_ytdl(c: Client, cq: CallbackQuery, state: CallbackState, kind: str, s: Strings):
+    video = state.value
+    if video["sizes"][kind] > MAX_FILESIZE:
         await cq.answer(
             s("ytdl_file_too_big"),
             show_alert=True,
             cache_time=60,
         )
         return
-    vid = re.sub(r"^\_(vid|aud)\.", "", data)
-    url = f"https://www.youtube.com/watch?v={vid}"
+    state.drop()
     await cq.message.edit_text(s("ytdl_downloading"))
+    await enqueue(
+        "ytdl",
+        {
+            "video_id": video["video_id"],
+            "video": kind == "vid",
+            "temp": video["temp"],
+            "chat_id": cq.message.chat.id,
+            "reply_to": video["reply_to"],
+        },
+        status=cq.message,
+    )
+
+
+@job_handler("ytdl")
+async def ytdl_job(c: Client, job: Job):
+    payload = job.payload
+    s = get_strings(await get_lang(payload["chat_id"], c))
+    async with ProgressReporter(job.edit_status) as progress:
+        await download_and_send(c, job, s, progress)
+
+
+async def download_and_send(c: Client, job: Job, s: Strings, progress: ProgressReporter):
+    payload = job.payload
+    url = f"https://www.youtube.com/watch?v={payload['video_id']}"
+    temp = payload["temp"]
+
+    ttemp = f"⏰ {datetime.timedelta(seconds=temp)} | " if temp else ""
     with tempfile.TemporaryDirectory() as tempdir:
-        path = Path(tempdir) / "ytdl"
-
-    ttemp = f"⏰ {datetime.timedelta(seconds=int(temp))} | " if int(temp) else ""
-    if "vid" in data:
-        ydl = YoutubeDL({
-            "outtmpl": f"{path}/%(title)s-%(id)s.%(ext)s",
-            "format": "best[ext=mp4]",
-            "max_filesize": MAX_FILESIZE,
-            "noplaylist": True,
-        })
-    else:
         ydl = YoutubeDL({
-            "outtmpl": f"{path}/%(title)s-%(id)s.%(ext)s",
-            "format": "bestaudio[ext=m4a]",
+            "outtmpl": f"{tempdir}/%(title)s-%(id)s.%(ext)s",
+            "format": "best[ext=mp4]" if payload["video"] else "bestaudio[ext=m4a]",
             "max_filesize": MAX_FILESIZE,
             "noplaylist": True,
+            "progress_hooks": [progress.ytdl_hook(s("progress_downloading"))],
         })
-    try:
-        yt = await extract_info(ydl, url, download=True)
-    except BaseException as e:
-        await cq.message.edit_text(s("ytdl_send_error").format(errmsg=e))
-        return
-    await cq.message.edit_text(s("ytdl_sending"))
-    filename = ydl.prepare_filename(yt)
-    thumb = io.BytesIO((await http.get(yt["thumbnail"])).content)
-    thumb.name = "thumbnail.png"
-    try:
-        if "vid" in data:
-            await c.send_video(
-                int(cid),
-                filename,
-                width=1920,
-                height=1080,
-                caption=ttemp + yt["title"],
-                duration=yt["duration"],
-                thumb=thumb,
-                reply_to_message_id=int(mid),
-            )
-        else:
-            if " - " in yt["title"]:
-                performer, title = yt["title"].rsplit(" - ", 1)
+        try:
+            yt = await extract_info(ydl, url, download=True)
+        except DownloadError as e:
+            # Most likely a network issue, worth trying again.
+            if not job.last_attempt:
+                raise
+            await progress.finish(s("ytdl_send_error").format(errmsg=e))
+            return
+        progress.report(s("ytdl_sending"))
+        filename = ydl.prepare_filename(yt)
+        thumb = io.BytesIO((await http.get(yt["thumbnail"])).content)
+        thumb.name = "thumbnail.png"
+        try:
+            if payload["video"]:
+                await c.send_video(
+                    payload["chat_id"],
+                    filename,
+                    width=1920,
+                    height=1080,
+                    caption=ttemp + yt["title"],
+                    duration=yt["duration"],
+                    thumb=thumb,
+                    reply_to_message_id=payload["reply_to"],
+                    progress=progress.transfer(s("progress_uploading")),
+                )
             else:
-                performer = yt.get("creator") or yt.get("uploader")
-                title = yt["title"]
-            await c.send_audio(
-                int(cid),
-                filename,
-                title=title,
-                performer=performer,
-                caption=ttemp[:-2],
-                duration=yt["duration"],
-                thumb=thumb,
-                reply_to_message_id=int(mid),
-            )
-    except BadRequest as e:
-        await cq.message.edit_text(s("ytdl_send_error").format(errmsg=e))
-    else:
-        await cq.message.delete()
-
-    shutil.rmtree(tempdir, ignore_errors=True)
+                if " - " in yt["title"]:
+                    performer, title = yt["title"].rsplit(" - ", 1)
+                else:
+                    performer = yt.get("creator") or yt.get("uploader")
+                    title = yt["title"]
+                await c.send_audio(
+                    payload["chat_id"],
+                    filename,
+                    title=title,
+                    performer=performer,
+                    caption=ttemp[:-2],
+                    duration=yt["duration"],
+                    thumb=thumb,
+                    reply_to_message_id=payload["reply_to"],
+                    progress=progress.transfer(s("progress_uploading")),
+                )
+        except BadRequest as e:
+            await progress.finish(s("ytdl_send_error").format(errmsg=e))
+        else:
+            await progress.finish()
+            await job.delete_status()
 
 
 commands.add_command("yt", "tools")
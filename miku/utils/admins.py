@@ -0,0 +1,179 @@
+# SPDX-License-Identifier: MIT
+# Copyright (c) 2025 Elinsrc
+
+"""The administrators of the groups, cached.
+
+The roster of a group is fetched with a single ``get_chat_members`` call and
+kept in memory, and in ``groups.cached_admins`` to outlive restarts. It's
+dropped when a chat member update concerns an administrator, see
+:func:`invalidate_admins`, and fetched again once it's ADMIN_ROSTER_TTL old.
+
+The privileges of the bot itself are kept apart, see :func:`get_bot_privileges`.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import json
+import math
+import time
+from dataclasses import dataclass
+from typing import TYPE_CHECKING
+
+from hydrogram.enums import ChatMembersFilter, ChatMemberStatus
+from hydrogram.types import ChatMember, ChatPrivileges, User
+
+from miku.database.admin_rosters import get_cached_admins, set_cached_admins
+
+from .cache import TTLCache
+from .consts import ADMIN_STATUSES
+
+if TYPE_CHECKING:
+    from hydrogram import Client
+    from hydrogram.types import Chat
+
+# How many rosters are kept in memory.
+ADMIN_ROSTERS_SIZE = 1024
+
+# Seconds before a roster is fetched again, in case an update was missed.
+ADMIN_ROSTER_TTL = 60 * 60
+
+# How many groups the privileges of the bot are kept for.
+BOT_PRIVILEGES_SIZE = 4096
+
+
+@dataclass(frozen=True, slots=True)
+class AdminRoster:
+    # The Unix time it was fetched at.
+    fetched_at: float
+    members: dict[int, ChatMember]
+
+    @property
+    def expired(self) -> bool:
+        return self.fetched_at + ADMIN_ROSTER_TTL < time.time()
+
+
+admin_rosters = TTLCache(ADMIN_ROSTERS_SIZE, ADMIN_ROSTER_TTL)
+
+# The rosters being loaded, so concurrent lookups share a single fetch.
+loading: dict[int, asyncio.Task[AdminRoster]] = {}
+
+# They only change through an update the bot gets, so they don't expire.
+bot_privileges = TTLCache(BOT_PRIVILEGES_SIZE, math.inf)
+
+
+def dump_roster(roster: AdminRoster) -> str:
+    return json.dumps({
+        "fetched_at": roster.fetched_at,
+        "admins": [
+            {
+                "id": member.user.id,
+                "first_name": member.user.first_name,
+                "is_bot": member.user.is_bot,
+                "is_deleted": member.user.is_deleted,
+                "status": member.status.name,
+                "privileges": member.privileges
+                and {
+                    name: value
+                    for name, value in vars(member.privileges).items()
+                    if not name.startswith("_") and value
+                },
+            }
+            for member in roster.members.values()
+        ],
+    })
+
+
+def load_roster(client: Client, data: str) -> AdminRoster:
+    stored = json.loads(data)
+    members = {}
+    for admin in stored["admins"]:
+        privileges = admin["privileges"]
+        members[admin["id"]] = ChatMember(
+            client=client,
+            status=ChatMemberStatus[admin["status"]],
+            user=User(
+                client=client,
+                id=admin["id"],
+                first_name=admin["first_name"],
+                is_bot=admin["is_bot"],
+                is_deleted=admin["is_deleted"],
+            ),
+            privileges=None if privileges is None else ChatPrivileges(**privileges),
+        )
+    return AdminRoster(stored["fetched_at"], members)
+
+
+async def fetch_roster(chat: Chat) -> AdminRoster:
+    # So a roster loaded while it was invalidated isn't cached.
+    generation = admin_rosters.generation
+
+    stored = await get_cached_admins(chat.id)
+    if stored:
+        roster = load_roster(chat._client, stored)
+        if not roster.expired:
+            admin_rosters.set(chat.id, roster, generation)
+            return roster
+
+    # The basic groups ignore the filter and list every member.
+    members = {
+        member.user.id: member
+        async for member in chat._client.get_chat_members(
+            chat.id, filter=ChatMembersFilter.ADMINISTRATORS
+        )
+        if member.status in ADMIN_STATUSES
+    }
+    roster = AdminRoster(time.time(), members)
+    if generation == admin_rosters.generation:
+        admin_rosters.set(chat.id, roster)
+        await set_cached_admins(chat.id, dump_roster(roster))
+    return roster
+
+
+async def get_admins(chat: Chat) -> dict[int, ChatMember]:
+    """The administrators of a group, owner included, by user ID."""
+    roster = admin_rosters.get(chat.id)
+    if roster is None or roster.expired:
+        task = loading.get(chat.id)
+        if task is None:
+            task = loading[chat.id] = asyncio.create_task(fetch_roster(chat))
+            task.add_done_callback(lambda _: loading.pop(chat.id, None))
+        roster = await asyncio.shield(task)
+    return roster.members
+
+
+async def get_admin(chat: Chat, user_id: int) -> ChatMember | None:
+    """The member ``user_id`` of a group if they are an administrator, None otherwise."""
+    return (await get_admins(chat)).get(user_id)
+
+
+async def invalidate_admins(chat_id: int) -> None:
+    await set_cached_admins(chat_id, None)
+    # Dropped once the stored copy is gone, so a lookup can't load it back meanwhile.
+    admin_rosters.pop(chat_id)
+
+
+async def get_bot_privileges(chat: Chat) -> ChatPrivileges | None:
+    """The privileges of the bot in a group, None if it isn't an admin there."""
+    privileges = bot_privileges.get(chat.id, bot_privileges)
+    if privileges is not bot_privileges:
+        return privileges
+
+    generation = bot_privileges.generation
+    member = await chat.get_member("me")
+    privileges = member.privileges if member.status in ADMIN_STATUSES else None
+    bot_privileges.set(chat.id, privileges, generation)
+    return privileges
+
+
+def set_bot_privileges(chat_id: int, member: ChatMember):
+    """Record the new status of the bot in a group, from its chat member update."""
+    privileges = member.privileges if member.status in ADMIN_STATUSES else None
+    # Popping first keeps a lookup in progress from overwriting it.
+    bot_privileges.pop(chat_id)
+    bot_privileges.set(chat_id, privileges)
+
+
+def forget_bot_privileges(chat_id: int):
+    """Make the next lookup ask Telegram, e.g. after an action they should have allowed failed."""
+    bot_privileges.pop(chat_id)
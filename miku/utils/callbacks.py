@@ -0,0 +1,154 @@
+# SPDX-License-Identifier: MIT
+# Copyright (c) 2025 Elinsrc
+
+"""Routing of the callback queries by action.
+
+The callback data of a button is made of an action and its fields, separated
+by "|", see :func:`callback_data`. The handler of an action is registered with
+:func:`on_callback`, along with the types of its fields, and called with them
+parsed. Finding it takes a single dict lookup, instead of trying the regex of
+every callback query handler in turn.
+
+What doesn't fit in the 64 bytes of the data, like the results a menu pages
+through, is kept here instead, see :func:`store_state`. The button then only
+carries a short token, resolved into a :class:`CallbackState` field.
+"""
+
+from __future__ import annotations
+
+import secrets
+from collections.abc import Awaitable, Callable
+from dataclasses import dataclass
+from typing import TYPE_CHECKING, Any
+
+from loguru import logger
+
+from .cache import TTLCache
+from .context import get_context
+
+if TYPE_CHECKING:
+    from hydrogram import Client
+    from hydrogram.types import CallbackQuery
+
+SEPARATOR = "|"
+
+# Telegram refuses longer callback data, in bytes.
+MAX_CALLBACK_DATA = 64
+
+# The states of the menus, the oldest are dropped first when there are more.
+CALLBACK_STATES_SIZE = 2048
+
+# Seconds a menu keeps working after it was sent.
+CALLBACK_STATES_TTL = 60 * 60
+
+CallbackHandler = Callable[..., Awaitable[Any]]
+
+
+@dataclass(frozen=True, slots=True)
+class Route:
+    func: CallbackHandler
+    fields: tuple[Callable[[str], Any], ...]
+
+
+routes: dict[str, Route] = {}
+
+
+@dataclass(slots=True)
+class CallbackState:
+    """The state of a menu, kept until it expires or is dropped."""
+
+    token: str
+    value: Any
+    # Only this user may press the buttons, anyone may if None.
+    owner: int | None = None
+
+    def drop(self):
+        callback_states.pop(self.token)
+
+
+callback_states = TTLCache(CALLBACK_STATES_SIZE, CALLBACK_STATES_TTL)
+
+
+def store_state(value: Any, owner: int | None = None) -> str:
+    """Keep ``value`` for a menu and return the token its buttons carry."""
+    token = secrets.token_urlsafe(6)
+    callback_states.set(token, CallbackState(token, value, owner))
+    return token
+
+
+def on_callback(
+    action: str, *fields: Callable[[str], Any]
+) -> Callable[[CallbackHandler], CallbackHandler]:
+    """Register the handler of an action.
+
+    The handler is called with the client, the callback query and then the
+    fields, each one converted by the matching callable of ``fields``, e.g.
+    ``int``. The last field gets whatever is left, separators included.
+    A :class:`CallbackState` field is a token of :func:`store_state`, the
+    query is answered without calling the handler if it expired or the user
+    isn't its owner.
+    """
+    if SEPARATOR in action:
+        raise ValueError(f"The action '{action}' contains the separator.")
+
+    def decorator(func: CallbackHandler) -> CallbackHandler:
+        if action in routes:
+            raise ValueError(f"The action '{action}' already has a handler.")
+        routes[action] = Route(func, fields)
+        return func
+
+    return decorator
+
+
+def callback_data(action: str, *values: Any) -> str:
+    data = SEPARATOR.join((action, *map(str, values)))
+    if len(data.encode()) > MAX_CALLBACK_DATA:
+        raise ValueError(f"The callback data '{data}' is longer than {MAX_CALLBACK_DATA} bytes.")
+    return data
+
+
+async def dispatch_callback(client: Client, query: CallbackQuery):
+    """The hydrogram handler of every callback query, calling the handler of its action."""
+    if not isinstance(query.data, str):
+        return
+
+    action, _, rest = query.data.partition(SEPARATOR)
+    route = routes.get(action)
+    if route is None:
+        return
+
+    values = rest.split(SEPARATOR, len(route.fields) - 1) if route.fields else []
+    try:
+        if len(values) != len(route.fields):
+            raise ValueError(f"expected {len(route.fields)} fields")
+        fields = [
+            value if parse is CallbackState else parse(value)
+            for parse, value in zip(route.fields, values)
+        ]
+    except ValueError as e:
+        # E.g. a button from before its data changed.
+        logger.debug(f"Ignoring the callback data '{query.data}': {e}")
+        return
+
+    for index, parse in enumerate(route.fields):
+        if parse is not CallbackState:
+            continue
+
+        state = callback_states.get(fields[index])
+        if state is None:
+            s = await get_context(query).strings()
+            await query.answer(s("general_button_expired"), show_alert=True)
+            return
+        if state.owner is not None and state.owner != query.from_user.id:
+            s = await get_context(query).strings()
+            await query.answer(s("general_button_denied"), cache_time=60)
+            return
+        fields[index] = state
+
+    await route.func(client, query, *fields)
+
+
+@on_callback("ignore")
+async def ignore(c: Client, query: CallbackQuery):
+    # The buttons only showing something, like the page number, still need an answer.
+    await query.answer()
@@ -0,0 +1,79 @@
+# SPDX-License-Identifier: MIT
+# Copyright (c) 2025 Elinsrc
+
+from __future__ import annotations
+
+from typing import TYPE_CHECKING
+
+from hydrogram.enums import ChatType
+from hydrogram.types import CallbackQuery, ChatMemberUpdated, InlineQuery, Message
+
+from miku.database.chats import ChatContext, get_chat_context
+from miku.database.localization import resolved_lang_cache
+from miku.database.settings import settings_cache
+
+if TYPE_CHECKING:
+    from .localization import Strings
+
+Update = CallbackQuery | ChatMemberUpdated | InlineQuery | Message
+
+
+def update_chat(update: Update) -> tuple[int, ChatType]:
+    """The chat an update belongs to, as used to store its settings and language."""
+    if isinstance(update, CallbackQuery):
+        if update.message:
+            return update.message.chat.id, update.message.chat.type
+        return update.from_user.id, ChatType.PRIVATE
+    if isinstance(update, InlineQuery):
+        return update.from_user.id, ChatType.PRIVATE
+    if isinstance(update, Message | ChatMemberUpdated):
+        return update.chat.id, update.chat.type
+    raise TypeError(f"Update type '{type(update).__name__}' is not supported.")
+
+
+class UpdateContext:
+    """What the handlers need to know about an update, shared by all the handlers it goes through.
+
+    Everything is computed on first use. The language and the chat context are
+    computed again if a cache they come from was invalidated meanwhile, e.g. by a
+    handler changing the language of the chat.
+    """
+
+    __slots__ = ("_chat", "_chat_stamp", "_lang", "_lang_stamp", "update")
+
+    def __init__(self, update: Update):
+        self.update = update
+        self._lang: str | None = None
+        self._lang_stamp: int | None = None
+        self._chat: ChatContext | None = None
+        self._chat_stamp: tuple[int, int] | None = None
+
+    async def lang(self) -> str:
+        stamp = resolved_lang_cache.generation
+        if self._lang is None or self._lang_stamp != stamp:
+            from .localization import get_lang  # noqa: PLC0415
+
+            self._lang = await get_lang(self.update)
+            self._lang_stamp = stamp
+        return self._lang
+
+    async def strings(self) -> Strings:
+        from .localization import get_strings  # noqa: PLC0415
+
+        return get_strings(await self.lang())
+
+    async def chat(self) -> ChatContext:
+        stamp = (settings_cache.generation, resolved_lang_cache.generation)
+        if self._chat is None or self._chat_stamp != stamp:
+            self._chat = await get_chat_context(*update_chat(self.update))
+            self._chat_stamp = stamp
+        return self._chat
+
+
+def get_context(update: Update) -> UpdateContext:
+    """The context of an update, created on first use and kept on the update itself."""
+    # Attributes starting with an underscore are left out when hydrogram prints the update.
+    context = getattr(update, "_miku_context", None)
+    if context is None:
+        context = update._miku_context = UpdateContext(update)
+    return context
@@ -11,10 +11,7 @@ from hydrogram import Client, StopPropagation
 from hydrogram.enums import ChatType
 from hydrogram.types import CallbackQuery, ChatPrivileges, Message
 
-from miku.utils.localization import (
-    get_lang,
-    get_locale_string,
-)
+from miku.utils.context import get_context
 from miku.utils.utils import check_perms
 
 if TYPE_CHECKING:
@@ -58,11 +55,8 @@ def require_admin(
     def decorator(func):
         @wraps(func)
         async def wrapper(client: Client, message: CallbackQuery | Message, *args, **kwargs):
-            lang = await get_lang(message)
-            s = partial(
-                get_locale_string,
-                lang,
-            )
+            context = get_context(message)
+            s = await context.strings()
 
             if isinstance(message, CallbackQuery):
                 sender = partial(message.answer, show_alert=True)
@@ -78,13 +72,13 @@ def require_admin(
             # We don't actually check private and channel chats.
             if msg.chat.type == ChatType.PRIVATE:
                 if allow_in_private:
-                    return await func(client, message, *args, *kwargs)
+                    return await func(client, message, *args, **kwargs)
                 return await sender(s("cmd_private_not_allowed"))
             if msg.chat.type == ChatType.CHANNEL:
-                return await func(client, message, *args, *kwargs)
+                return await func(client, message, *args, **kwargs)
             has_perms = await check_perms(message, permissions, complain_missing_perms, s)
             if has_perms:
-                return await func(client, message, *args, *kwargs)
+                return await func(client, message, *args, **kwargs)
             return None
 
         return wrapper
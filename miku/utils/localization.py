@@ -5,15 +5,21 @@
 from __future__ import annotations
 
 import yaml
+import hashlib
 import logging
+import pickle
+import sys
 from collections.abc import Callable
-from functools import partial
+from functools import lru_cache
 from pathlib import Path
 
 from hydrogram.enums import ChatType
-from hydrogram.types import CallbackQuery, InlineQuery, Message, ChatMemberUpdated
+from hydrogram.types import CallbackQuery, InlineQuery, Message
 
-from miku.database.localization import get_db_lang
+from miku.database.chats import get_chat_context, get_chat_type, remember_chat_type
+from miku.database.localization import resolved_lang_cache
+
+from .context import get_context, update_chat
 
 enabled_locales: list[str] = [
     "en-GB",  # English (United Kingdom)
@@ -22,6 +28,41 @@ enabled_locales: list[str] = [
 
 default_language: str = "en-GB"
 
+# The parsed locales are kept here, by file hash, so they are only parsed again once changed.
+LOCALES_CACHE_DIR = Path("locales", "__pycache__")
+
+# libyaml's loader is much faster, but it isn't always available.
+YamlLoader = getattr(yaml, "CSafeLoader", yaml.SafeLoader)
+
+
+def load_locale_file(file: Path) -> dict[str, str]:
+    data = file.read_bytes()
+    digest = hashlib.sha256(data).hexdigest()
+    cache = LOCALES_CACHE_DIR / f"{file.stem}.{sys.implementation.cache_tag}.pickle"
+
+    try:
+        with cache.open("rb") as f:
+            cached_digest, locale_keys = pickle.load(f)
+        if cached_digest == digest:
+            return locale_keys
+    except Exception:
+        # A corrupt or stale pickle can fail with almost anything, the YAML is the truth.
+        pass
+
+    locale_keys = yaml.load(data.decode("utf8"), Loader=YamlLoader)  # noqa: S506
+
+    try:
+        LOCALES_CACHE_DIR.mkdir(exist_ok=True)
+        # Written aside, then renamed, so a concurrent start never reads half of it.
+        tmp = cache.with_suffix(".tmp")
+        with tmp.open("wb") as f:
+            pickle.dump((digest, locale_keys), f, protocol=pickle.HIGHEST_PROTOCOL)
+        tmp.replace(cache)
+    except OSError:
+        logging.warning("Unable to write the locales cache to %s", LOCALES_CACHE_DIR)
+
+    return locale_keys
+
 
 def cache_locales(locales: list[str]) -> dict[str, dict[str, str]]:
     # init ldict with empty dict
@@ -38,7 +79,7 @@ def cache_locales(locales: list[str]) -> dict[str, dict[str, str]]:
             )
             continue
 
-        locale_keys = yaml.safe_load(file.open("r", encoding="utf8"))
+        locale_keys = load_locale_file(file)
 
         if "_meta_language_name" not in locale_keys or "_meta_language_flag" not in locale_keys:
             logging.warning(
@@ -51,54 +92,108 @@ def cache_locales(locales: list[str]) -> dict[str, dict[str, str]]:
     return locales_dict
 
 
+class LocaleStrings(dict):
+    """The strings of a locale, a missing key is returned as is."""
+
+    def __missing__(self, key: str) -> str:
+        return key
+
+
+def compile_locales(locales_dict: dict[str, dict[str, str]]) -> dict[str, LocaleStrings]:
+    """Flatten the fallback chain of every locale into a single dict.
+
+    A string comes from the locale itself, then, for a tone variant (with an @),
+    from its parent locale, then from the default language. Empty strings fall back too.
+    """
+    compiled = {}
+
+    for locale, strings in locales_dict.items():
+        chain = [locales_dict.get(default_language, {})]
+        parent = locale.split("@", 1)[0]
+        if "@" in locale and parent in locales_dict:
+            chain.append(locales_dict[parent])
+        chain.append(strings)
+
+        resolved = LocaleStrings()
+        for layer in chain:
+            resolved.update((key, value) for key, value in layer.items() if value)
+        compiled[locale] = resolved
+
+    return compiled
+
+
 langdict = cache_locales(enabled_locales)
+compiled_locales = compile_locales(langdict)
+
+
+def reload_locales() -> int:
+    """Load the locale files again and swap the strings in, return the number of locales loaded.
+
+    Both tables are fully built first, then updated in place without awaiting, so
+    handlers never see a mix of old and new strings; the ones already running keep
+    the strings they started with.
+    """
+    new_langdict = cache_locales(enabled_locales)
+    if missing := langdict.keys() - new_langdict.keys():
+        raise ValueError(f"Unable to load the locales {', '.join(sorted(missing))}, nothing was reloaded.")
+    new_compiled = compile_locales(new_langdict)
+
+    langdict.clear()
+    langdict.update(new_langdict)
+    compiled_locales.clear()
+    compiled_locales.update(new_compiled)
+    return len(new_langdict)
 
 
 def get_locale_string(
     language: str,
     key: str,
 ) -> str:
-    if "@" in language and language.split("@", 1)[0] in langdict:
-        # if an @ (tone modifier) is present, try to get string from parent language if nullish
-        string = langdict[language].get(key) or langdict[language.split("@", 1)[0]].get(key)
-    else:
-        string = langdict[language].get(key)
-
-    # return and fallback if nullish
-    return string or langdict[default_language].get(key) or key
+    return compiled_locales[language][key]
 
 
 Strings = Callable[[str], str]
 
 
+def get_strings(language: str) -> Strings:
+    """The function returning the strings of ``language``, a single dict lookup per string."""
+    return compiled_locales[language].__getitem__
+
+
 async def get_lang(message: CallbackQuery | Message | InlineQuery, client = None) -> str:
     if isinstance(message, int):
         chat_id = message
-        chat = await client.get_chat(chat_id)
-        chat_type = chat.type
-        lang = await get_db_lang(chat_id, chat_type)
+        chat_type = await get_chat_type(chat_id)
+        if chat_type is None:
+            # Not in the database, only Telegram knows about it.
+            if client is None:
+                return default_language
+            chat_type = (await client.get_chat(chat_id)).type
+            remember_chat_type(chat_id, chat_type)
+        lang = (await get_chat_context(chat_id, chat_type)).lang
         return lang if lang in enabled_locales else default_language
-    elif isinstance(message, CallbackQuery):
-        chat = message.message.chat if message.message else message.from_user
-        chat_type = message.message.chat.type if message.message else ChatType.PRIVATE
-    elif isinstance(message, Message):
-        chat = message.chat
-        chat_type = message.chat.type
-    elif isinstance(message, InlineQuery):
-        chat = message.from_user
-        chat_type = ChatType.PRIVATE
-    elif isinstance(message, ChatMemberUpdated):
-        chat = message.chat
-        chat_type = message.chat.type
-    else:
-        raise TypeError(f"Update type '{message.__name__}' is not supported.")
-
-    lang = await get_db_lang(chat.id, chat_type)
-
-    if chat_type == ChatType.PRIVATE:
-        lang = lang or message.from_user.language_code or default_language
-    else:
-        lang = lang or default_language
+
+    chat_id, chat_type = update_chat(message)
+
+    # Only private chats fall back to the language of the user.
+    language_code = message.from_user.language_code if chat_type == ChatType.PRIVATE else None
+
+    cached = resolved_lang_cache.get(chat_id)
+    if cached is not None and (chat_type, language_code) in cached:
+        return cached[chat_type, language_code]
+
+    generation = resolved_lang_cache.generation
+    lang = (await get_context(message).chat()).lang
+    lang = resolve_locale(lang or language_code or default_language)
+
+    cached = resolved_lang_cache.get(chat_id) or {}
+    resolved_lang_cache.set(chat_id, {**cached, (chat_type, language_code): lang}, generation)
+    return lang
+
+
+@lru_cache(maxsize=256)
+def resolve_locale(lang: str) -> str:
+    """Turn a language code into one of the enabled locales."""
     # User has a language_code without hyphen
     if len(lang.split("-")) == 1:
         # Try to find a language that starts with the provided language_code
@@ -116,9 +211,8 @@ def use_chat_lang(func: Callable):
     """Decorator to get the chat language and pass it to the function."""
 
     async def wrapper(client, message, *args, **kwargs):
-        lang = await get_lang(message)
+        s = await get_context(message).strings()
 
-        lfunc = partial(get_locale_string, lang)
-        return await func(client, message, *args, lfunc, **kwargs)
+        return await func(client, message, *args, s, **kwargs)
 
     return wrapper
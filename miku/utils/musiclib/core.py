@@ -25,8 +25,12 @@ from .data import ServiceConfig, Track
 from .exceptions import MusicServiceError
 
 if TYPE_CHECKING:
+    from collections.abc import Awaitable, Callable
     from types import TracebackType
 
+# Size of the chunks the downloads are read in, in bytes.
+DOWNLOAD_CHUNK_SIZE = 64 * 1024
+
 
 class Music:
     """Service for searching and downloading music."""
@@ -124,8 +128,9 @@ class Music:
         url: str,
         resource_type: str,
         track_name: str,
+        progress: Callable[[int, int], Awaitable[object]] | None = None,
     ) -> bytes:
-        """Download data."""
+        """Download data, calling ``progress`` with the bytes received so far and the total."""
         max_size = 50 * 1024 * 1024  # 50MB
 
         if not self._session:
@@ -145,7 +150,14 @@ class Music:
                 if content_length and content_length > max_size:
                     self._raise_file_too_large_error(content_length)
 
-                return await response.read()
+                if progress is None:
+                    return await response.read()
+
+                data = bytearray()
+                async for chunk in response.content.iter_chunked(DOWNLOAD_CHUNK_SIZE):
+                    data += chunk
+                    await progress(len(data), content_length or 0)
+                return bytes(data)
 
         except (aiohttp.ClientError, TimeoutError) as e:
             msg = f"Failed to download {resource_type}"
@@ -155,9 +167,13 @@ class Music:
         stop=stop_after_attempt(3),
         wait=wait_exponential(multiplier=1, min=1, max=5),
     )
-    async def get_audio_bytes(self, track: Track) -> bytes:
+    async def get_audio_bytes(
+        self,
+        track: Track,
+        progress: Callable[[int, int], Awaitable[object]] | None = None,
+    ) -> bytes:
         """Download music file."""
-        return await self._download_data(track.audio_url, "audio", track.name)
+        return await self._download_data(track.audio_url, "audio", track.name, progress)
 
     def build_search_query(self, keyword: str) -> str:
         """Build search query with cleaned keyword."""
@@ -0,0 +1,155 @@
+# SPDX-License-Identifier: MIT
+# Copyright (c) 2025 Elinsrc
+
+from __future__ import annotations
+
+import asyncio
+import contextlib
+import threading
+import time
+from collections.abc import Awaitable, Callable
+from typing import Any
+
+from hydrogram.errors import RPCError
+from loguru import logger
+
+from miku.outbound import bulk_sends
+
+from .utils import pretty_size
+
+# The least number of seconds between two edits of a progress message.
+PROGRESS_INTERVAL = 5
+
+
+def format_transfer(text: str, current: int, total: int) -> str:
+    """Fill ``text`` with the ``percent``, ``current`` and ``total`` of a transfer."""
+    percent = current * 100 // total if total else 0
+    return text.format(
+        percent=percent, current=pretty_size(current), total=pretty_size(total) if total else "?"
+    )
+
+
+class ProgressReporter:
+    """Show the progress of a long operation by editing a message.
+
+    Reports may come as often as they like, from any thread. The message is
+    edited with the latest one at most once every ``interval`` seconds, those
+    in between are dropped. :meth:`finish` shows the final state right away,
+    the last transfer as complete by default.
+    """
+
+    def __init__(
+        self, edit: Callable[[str], Awaitable[Any]], interval: float = PROGRESS_INTERVAL
+    ):
+        self.edit = edit
+        self.interval = interval
+        self.loop = asyncio.get_running_loop()
+        self.loop_thread = threading.get_ident()
+        self.pending: str | None = None
+        self.shown: str | None = None
+        self.last_edit = 0.0
+        self.flush_task: asyncio.Task | None = None
+        self.lock = asyncio.Lock()
+        self.closed = False
+        # The text and size of the last transfer reported, shown as complete by finish.
+        self.last_transfer: tuple[str, int] | None = None
+
+    async def __aenter__(self) -> ProgressReporter:
+        return self
+
+    async def __aexit__(self, exc_type: type[BaseException] | None, *exc_info: object):
+        # Nothing is shown after the operation. If it failed, its progress is left for
+        # the caller to replace with the error.
+        if self.closed:
+            return
+        if exc_type is None:
+            await self.finish()
+        else:
+            await self.cancel()
+
+    def report(self, text: str):
+        if threading.get_ident() == self.loop_thread:
+            self.set_pending(text)
+        else:
+            self.loop.call_soon_threadsafe(self.set_pending, text)
+
+    def set_pending(self, text: str):
+        if self.closed:
+            return
+
+        self.pending = text
+        if self.flush_task is None:
+            delay = max(0.0, self.last_edit + self.interval - time.monotonic())
+            self.flush_task = self.loop.create_task(self.flush_later(delay))
+
+    async def flush_later(self, delay: float):
+        await asyncio.sleep(delay)
+        async with self.lock:
+            # Under the lock, so a report coming meanwhile can't start a second edit
+            # alongside this one.
+            self.flush_task = None
+            # The progress waits behind the other messages of the chat.
+            with bulk_sends():
+                await self.edit_pending()
+
+    async def flush(self):
+        async with self.lock:
+            await self.edit_pending()
+
+    async def edit_pending(self):
+        text, self.pending = self.pending, None
+        if text is None or text == self.shown:
+            return
+
+        self.shown = text
+        self.last_edit = time.monotonic()
+        try:
+            await self.edit(text)
+        except RPCError as e:
+            logger.warning(f"Unable to show the progress: {e}")
+
+    async def cancel(self):
+        """Drop the pending progress, nothing is shown anymore."""
+        self.closed = True
+        if self.flush_task is not None:
+            self.flush_task.cancel()
+            with contextlib.suppress(asyncio.CancelledError):
+                await self.flush_task
+            self.flush_task = None
+        self.pending = None
+
+    async def finish(self, text: str | None = None):
+        """Drop the pending progress and show ``text``, or the last transfer as complete."""
+        await self.cancel()
+        if text is None and self.last_transfer is not None:
+            text, total = self.last_transfer
+            text = format_transfer(text, total, total)
+
+        self.pending = text
+        await self.flush()
+
+    def transfer(self, text: str) -> Callable[[int, int], Awaitable[None]]:
+        """A ``progress`` callback for the hydrogram uploads and downloads.
+
+        ``text`` is formatted with :func:`format_transfer`.
+        """
+
+        async def progress(current: int, total: int):
+            self.last_transfer = (text, total)
+            self.report(format_transfer(text, current, total))
+
+        return progress
+
+    def ytdl_hook(self, text: str) -> Callable[[dict[str, Any]], None]:
+        """A yt-dlp progress hook, ``text`` is formatted with :func:`format_transfer`."""
+
+        def hook(status: dict[str, Any]):
+            if status["status"] != "downloading":
+                return
+
+            current = status.get("downloaded_bytes") or 0
+            total = int(status.get("total_bytes") or status.get("total_bytes_estimate") or 0)
+            self.last_transfer = (text, total or current)
+            self.report(format_transfer(text, current, total))
+
+        return hook
@@ -28,6 +28,8 @@ from hydrogram.types import (
 
 from config import SUDOERS
 
+from .admins import get_admin
+
 BTN_URL_REGEX = re.compile(r"(\[([^\[]+?)\]\(buttonurl:(?:/{0,2})(.+?)(:same)?\))")
 
 SMART_OPEN = "“"
@@ -67,15 +69,15 @@ async def check_perms(
     else:
         sender = message.reply_text
         chat = message.chat
-    # TODO: Cache all admin permissions in db.
-    user = await chat.get_member(message.from_user.id)
-    if user.status == ChatMemberStatus.OWNER:
+    # None unless the user is an admin.
+    user = await get_admin(chat, message.from_user.id)
+    if user is not None and user.status == ChatMemberStatus.OWNER:
         return True
 
     # No permissions specified, accept being an admin.
-    if not permissions and user.status == ChatMemberStatus.ADMINISTRATOR:
+    if not permissions and user is not None and user.status == ChatMemberStatus.ADMINISTRATOR:
         return True
-    if user.status != ChatMemberStatus.ADMINISTRATOR:
+    if user is None or user.status != ChatMemberStatus.ADMINISTRATOR:
         if complain_missing_perms:
             await sender(s("admins_no_admin_error"))
         return False